@@ -0,0 +1,36 @@
+"""
+基准测试辅助工具
+需要造数据的基准测试命令都在临时创建的测试数据库中运行（与 manage.py test 相同的方式），结束后销毁，不会污染业务库。
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """
+    创建并切换到测试数据库，退出时销毁
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def timeit(func, repeat=5, number=1):
+    """
+    执行 repeat 轮、每轮调用 number 次，返回单次调用的最好耗时（秒）和最后一次的返回值
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            result = func()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
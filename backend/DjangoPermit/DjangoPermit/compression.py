@@ -0,0 +1,66 @@
+"""
+响应压缩中间件
+按 Accept-Encoding 协商：客户端支持 br 且安装了 brotli 时用 brotli，否则交给 Django 的 GZipMiddleware 用 gzip。
+小于 COMPRESSION_MIN_SIZE 字节的响应不压缩（压缩收益抵不上 CPU 开销）。
+流式响应（导出接口）只用 gzip 分块压缩。
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+
+def parse_accept_encoding(header):
+    """
+    解析 Accept-Encoding，返回 {编码: q 值}
+    """
+    encodings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[coding] = q
+    return encodings
+
+
+class CompressionMiddleware(GZipMiddleware):
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        encodings = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is None or response.streaming or encodings.get('br', 0) <= 0 \
+                or encodings.get('br', 0) < encodings.get('gzip', 0):
+            if encodings.get('gzip', 1) <= 0:
+                # gzip;q=0 表示不接受 gzip；GZipMiddleware 只看是否出现 gzip，不看 q 值
+                patch_vary_headers(response, ('Accept-Encoding',))
+                return response
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # 压缩后的强 ETag 改为弱 ETag，条件请求仍可匹配（与 GZipMiddleware 一致）
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,107 @@
+"""
+列表接口的总数缓存
+后台管理页面的搜索框每输入一个字都会请求一次列表，每次都要 COUNT(*)。
+这里把总数按 (接口, 规范化后的筛选条件, 相关表的版本号) 缓存起来：表有写入时递增表版本号，旧的总数自然失效。
+开启 COUNT_CACHE_ASYNC_REFRESH 后，版本变化后的第一次请求先返回上一次算出的（略微过期的）总数，
+同时在后台线程中重新计算，后续请求拿到新值。
+总数和表版本号都存放在默认缓存中，多进程部署必须使用共享缓存（DJANGO_REDIS_URL），
+否则其他 worker 进程看不到写入后递增的版本号，会一直返回写入前的总数（见 DjangoPermit/versions.py）。
+"""
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from DjangoPermit.routers import use_primary
+from DjangoPermit.versions import bump_versions, get_versions
+
+TABLE_VERSION = 'table:%s'
+
+# 后台刷新总数的线程池，同一个键同时只刷新一次
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='count-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def table_version_names(models):
+    return [TABLE_VERSION % model._meta.db_table for model in models]
+
+
+def bump_table_versions(*models):
+    """
+    表有增删或影响筛选条件的修改后调用，使依赖这些表的总数缓存失效
+    """
+    bump_versions(table_version_names(models))
+
+
+def normalize_filters(filters):
+    """
+    规范化筛选条件：去掉空值，字符串去除首尾空格，键排序后序列化，得到稳定的摘要
+    """
+    normalized = {}
+    for name, value in filters.items():
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            continue
+        normalized[name] = value
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def cached_count(endpoint, queryset, filters, models):
+    """
+    带缓存的 queryset.count()
+    :param endpoint: 接口标识，如 'user:search'
+    :param queryset: 已加好筛选条件的查询集
+    :param filters: 决定筛选结果的请求参数（用于区分缓存条目）
+    :param models: 筛选结果依赖的模型，任一模型对应的表版本变化后重新计算
+    :return: 总数
+    """
+    names = table_version_names(models)
+    versions = get_versions(names)
+    version = '.'.join(str(versions[name]) for name in names)
+    base_key = 'count:%s:%s' % (endpoint, normalize_filters(filters))
+    key = '%s:%s' % (base_key, version)
+    total = cache.get(key)
+    if total is not None:
+        return total
+
+    if settings.COUNT_CACHE_ASYNC_REFRESH:
+        # 上一次算出的总数（不带版本号），先返回它，再在后台刷新
+        stale = cache.get(base_key)
+        if stale is not None:
+            _schedule_refresh(key, base_key, queryset)
+            return stale
+
+    # 总数会按新版本号缓存，从主库计算，避免把从库复制延迟期间的旧值缓存下来
+    with use_primary():
+        total = queryset.count()
+    _store(key, base_key, total)
+    return total
+
+
+def _store(key, base_key, total):
+    cache.set_many({key: total, base_key: total}, timeout=settings.COUNT_CACHE_TIMEOUT)
+
+
+def _schedule_refresh(key, base_key, queryset):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    _refresh_executor.submit(_refresh, key, base_key, queryset)
+
+
+def _refresh(key, base_key, queryset):
+    try:
+        _store(key, base_key, queryset.count())
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+        # 后台线程不经过请求周期，需要自己归还数据库连接
+        close_old_connections()
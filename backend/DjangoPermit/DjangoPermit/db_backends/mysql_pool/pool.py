@@ -0,0 +1,221 @@
+"""
+进程内数据库连接池
+与具体驱动无关：factory 负责建立新连接，ping / close 负责探活和关闭。
+  size          常驻的空闲连接数上限
+  max_overflow  高峰期允许额外创建的连接数，归还时超出 size 的直接关闭
+  timeout       连接全部借出时最多等待的秒数，超时抛 PoolTimeout
+  recycle       连接最长存活秒数，超过后借出/归还时关闭重建（需小于 MySQL 的 wait_timeout）
+  pre_ping      借出前探活；空闲不足 ping_idle 秒的连接视为健康，不再 ping
+统计借出次数、新建/关闭/回收次数、探活失败次数和等待耗时，见 stats()。
+连接池按 (进程号, 别名, ...) 登记在本模块中，pool_stats() 汇总当前进程的统计。
+"""
+import os
+import threading
+import time
+from collections import deque
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """
+    等待空闲连接超时
+    """
+
+
+class ConnectionPool:
+
+    def __init__(self, factory, ping, close, size=10, max_overflow=10, timeout=10.0, recycle=3600,
+                 pre_ping=True, ping_idle=5.0, timeout_error=PoolTimeout):
+        self.factory = factory
+        self.ping = ping
+        self.close_connection = close
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.ping_idle = ping_idle
+        self.timeout_error = timeout_error
+        self._idle = deque()  # (连接, 创建时间, 归还时间)
+        self._created_at = {}  # id(借出的连接) -> 创建时间
+        self._total = 0  # 已建立的连接数（空闲 + 借出）
+        self._cond = threading.Condition()
+        self.checkouts = 0
+        self.created = 0
+        self.closed = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def acquire(self):
+        """
+        借出一个连接：优先复用空闲连接，其次新建，达到上限时等待
+        探活、关闭、新建连接都是网络 I/O，在锁外执行，锁只用于取出空闲连接和更新计数
+        :return: (连接, 是否复用的旧连接)
+        """
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                while not self._idle and self._total >= self.size + self.max_overflow:
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise self.timeout_error(
+                            '数据库连接池已满（%d 个连接），等待 %.1f 秒仍无空闲连接' % (self._total, self.timeout))
+                    waited = True
+                    self._cond.wait(remaining)
+                if not self._idle:
+                    # 先占一个名额再建立连接
+                    self._total += 1
+                    break
+                # 取出的空闲连接仍计入 _total，检查完成前其他线程不会超额新建
+                conn, created_at, released_at = self._idle.pop()
+            if self._expired(created_at):
+                self._close(conn)
+                with self._cond:
+                    self.recycled += 1
+                    self._closed()
+                continue
+            if self.pre_ping and time.monotonic() - released_at >= self.ping_idle and not self._alive(conn):
+                self._close(conn)
+                with self._cond:
+                    self.ping_failures += 1
+                    self._closed()
+                continue
+            with self._cond:
+                return self._checkout(conn, created_at, start, waited), True
+        try:
+            conn = self.factory()
+        except BaseException:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+            return self._checkout(conn, time.monotonic(), start, waited), False
+
+    def release(self, conn, discard=False):
+        """
+        归还连接；discard=True（连接已损坏）、超过存活时间或空闲连接已满时直接关闭（在锁外关闭）
+        """
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), None)
+            if created_at is None:
+                return
+            expired = self._expired(created_at)
+            if not (discard or expired or len(self._idle) >= self.size):
+                self._idle.append((conn, created_at, time.monotonic()))
+                self._cond.notify()
+                return
+        self._close(conn)
+        with self._cond:
+            if expired and not discard:
+                self.recycled += 1
+            self._closed()
+
+    def dispose(self):
+        """
+        关闭所有空闲连接（借出中的连接归还时再关闭）
+        """
+        with self._cond:
+            idle = [entry[0] for entry in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            self._close(conn)
+        with self._cond:
+            for _ in idle:
+                self._closed()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'connections': self._total,
+                'idle': len(self._idle),
+                'checked_out': len(self._created_at),
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'closed': self.closed,
+                'recycled': self.recycled,
+                'ping_failures': self.ping_failures,
+                'timeouts': self.timeouts,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+            }
+
+    def _checkout(self, conn, created_at, start, waited):
+        self._created_at[id(conn)] = created_at
+        self.checkouts += 1
+        if waited:
+            elapsed = time.monotonic() - start
+            self.waits += 1
+            self.wait_time += elapsed
+            self.max_wait_time = max(self.max_wait_time, elapsed)
+        return conn
+
+    def _expired(self, created_at):
+        return self.recycle is not None and time.monotonic() - created_at >= self.recycle
+
+    def _alive(self, conn):
+        try:
+            self.ping(conn)
+        except Exception:
+            return False
+        return True
+
+    def _close(self, conn):
+        # 关闭连接可能涉及网络 I/O，调用方不持有锁
+        try:
+            self.close_connection(conn)
+        except Exception:
+            pass
+
+    def _closed(self):
+        # 调用方持有锁：连接已关闭，释放名额并唤醒一个等待的线程
+        self._total -= 1
+        self.closed += 1
+        self._cond.notify()
+
+
+def get_pool(key, create):
+    """
+    按 key 获取当前进程的连接池，没有时调用 create() 创建。
+    key 前会加上进程号：gunicorn --preload 等 fork 场景下子进程不会复用父进程的连接。
+    """
+    key = (os.getpid(),) + key
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = create()
+    return pool
+
+
+def pool_stats():
+    """
+    当前进程所有连接池的统计，{别名: stats}
+    """
+    pid = os.getpid()
+    return {key[1]: pool.stats() for key, pool in list(_pools.items()) if key[0] == pid}
+
+
+def dispose_pools():
+    """
+    关闭当前进程所有连接池中的空闲连接
+    """
+    pid = os.getpid()
+    for key, pool in list(_pools.items()):
+        if key[0] == pid:
+            pool.dispose()
@@ -0,0 +1,108 @@
+"""
+流式导出（CSV / NDJSON）
+按主键分块读取数据（WHERE id > 上一块最后的 id LIMIT n），每块渲染成一段文本后立即发送，内存占用只与块大小有关。
+没有直接用 queryset.iterator()：PyMySQL 默认的游标会把整个结果集读进客户端内存，分块查询在 MySQL 和 SQLite 上都能保持内存平稳。
+ASGI 下使用异步迭代器，每块在线程中查询一次，避免 Django 为同步迭代器把全部内容先读进内存。
+"""
+import csv
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 1000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def iter_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    按主键顺序分块读取 .values() 查询集（必须包含 id），每次产出一个字典列表
+    """
+    queryset = queryset.order_by('id')
+    last_id = None
+    while True:
+        chunk_queryset = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1]['id']
+
+
+class _Echo:
+    """
+    csv.writer 需要一个文件对象，这里直接返回写入的内容
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        # 关联列表（如角色列表）在 CSV 中用顿号连接名称
+        return '、'.join(str(item.get('name', '')) if isinstance(item, dict) else str(item) for item in value)
+    return value
+
+
+def render_csv(chunks, fields):
+    writer = csv.writer(_Echo())
+    # 带 BOM，Excel 打开中文不乱码
+    yield '\ufeff' + writer.writerow(fields)
+    for chunk in chunks:
+        yield ''.join(writer.writerow([_csv_value(row.get(field)) for field in fields]) for row in chunk)
+
+
+def render_ndjson(chunks, fields):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for chunk in chunks:
+        yield ''.join(encoder.encode({field: row.get(field) for field in fields}) + '\n' for row in chunk)
+
+
+RENDERERS = {
+    'csv': render_csv,
+    'ndjson': render_ndjson,
+}
+
+
+def _async_content(content):
+    async def iterate():
+        iterator = iter(content)
+        while True:
+            part = await sync_to_async(next)(iterator, None)
+            if part is None:
+                return
+            yield part
+    return iterate()
+
+
+def export_response(request, chunks, fields, filename):
+    """
+    生成流式导出响应
+    :param request: 请求，format 参数为 csv（默认）或 ndjson
+    :param chunks: 产出字典列表的迭代器（一般是 iter_chunks 的结果，可在每块上附带关联数据）
+    :param fields: 输出的字段（CSV 的表头）
+    :param filename: 下载文件名（不含扩展名）
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in RENDERERS:
+        raise ExportError(f'不支持的导出格式: {fmt}')
+    content = RENDERERS[fmt](chunks, fields)
+    if isinstance(request, ASGIRequest):
+        content = _async_content(content)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (filename, fmt)
+    return response
@@ -0,0 +1,32 @@
+"""
+列表接口的字段筛选（sparse fieldsets）
+客户端通过 fields 参数（逗号分隔的字符串或列表）只取需要的字段，同时缩小 SQL 查询的列和 JSON 输出。
+每个接口有自己的字段白名单，白名单之外的字段直接报错；id 始终返回。
+"""
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def parse_fields(value, allowed, required=('id',)):
+    """
+    解析 fields 参数
+    :param value: 请求中的 fields，为空时返回全部字段
+    :param allowed: 接口允许的字段（白名单），决定输出顺序
+    :param required: 始终包含的字段
+    :return: 字段元组（按白名单顺序）
+    """
+    if value is None or value == '' or value == []:
+        return tuple(allowed)
+    if isinstance(value, str):
+        requested = [name.strip() for name in value.split(',') if name.strip()]
+    elif isinstance(value, list):
+        requested = value
+    else:
+        raise FieldsError('fields 必须是逗号分隔的字符串或字段列表')
+    unknown = [str(name) for name in requested if name not in allowed]
+    if unknown:
+        raise FieldsError('不支持的字段: %s，可选字段: %s' % (', '.join(unknown), ', '.join(allowed)))
+    wanted = set(requested).union(required)
+    return tuple(name for name in allowed if name in wanted)
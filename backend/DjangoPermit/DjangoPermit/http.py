@@ -0,0 +1,54 @@
+"""
+JSON 响应
+与 django.http.JsonResponse 用法相同，装有 orjson 时用 orjson 编码（原生支持 date/datetime，比标准库快数倍），
+没有安装时退回标准库 + DjangoJSONEncoder。输出 UTF-8（中文不再转义成 \\uXXXX）。
+"""
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.functional import Promise
+
+from DjangoPermit.metrics import timed
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def _default(value):
+    """
+    orjson 不认识的类型：Decimal、惰性翻译字符串等，交给 DjangoJSONEncoder
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Promise):
+        return str(value)
+    return _django_encoder.default(value)
+
+
+def dumps(data):
+    """
+    把数据编码成 JSON 字节（耗时计入当前请求的 json 统计）
+    """
+    with timed('json'):
+        if orjson is not None:
+            return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class JsonResponse(HttpResponse):
+    """
+    替代 django.http.JsonResponse
+    :param data: 要编码的数据，safe=True 时必须是字典
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
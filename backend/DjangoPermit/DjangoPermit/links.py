@@ -0,0 +1,58 @@
+"""
+关联表（用户-角色、角色-菜单）的差量更新
+原来的做法是先删掉全部关联，再逐个 get() + create()，N 个关联就是 2N 条查询且不在事务中。
+这里先一次查询校验目标ID，再和现有关联求差集，只删除多余的、只插入缺少的，全部在一个事务中完成，
+并返回实际变化，调用方据此判断是否需要使缓存失效。
+"""
+from django.db import transaction
+
+
+def parse_ids(values):
+    """
+    规范化请求中的ID列表：转换为整数并去重（保持顺序），无法转换的原样返回在第二个列表中
+    """
+    ids = []
+    invalid = []
+    for value in values or []:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            invalid.append(value)
+            continue
+        if value not in ids:
+            ids.append(value)
+    return ids, invalid
+
+
+def sync_links(link_model, owner_field, owner_id, target_field, target_model, target_ids):
+    """
+    把 owner 的关联集合更新为 target_ids
+    :param link_model: 关联模型，如 SysUserRole
+    :param owner_field: 关联模型中指向 owner 的外键列，如 'user_id'
+    :param owner_id: owner 的ID
+    :param target_field: 关联模型中指向目标的外键列，如 'role_id'
+    :param target_model: 目标模型，用于校验ID是否存在
+    :param target_ids: 请求中的目标ID列表
+    :return: {'added': 新增的ID, 'removed': 删除的ID, 'ignored': 不存在或不合法的ID}
+    """
+    requested, ignored = parse_ids(target_ids)
+    existing = set(target_model.objects.filter(id__in=requested).values_list('id', flat=True)) if requested else set()
+    ignored += [target_id for target_id in requested if target_id not in existing]
+    wanted = [target_id for target_id in requested if target_id in existing]
+
+    with transaction.atomic():
+        # 锁住现有关联，避免并发分配时算出错误的差集
+        current = set(
+            link_model.objects.select_for_update()
+            .filter(**{owner_field: owner_id})
+            .values_list(target_field, flat=True)
+        )
+        added = [target_id for target_id in wanted if target_id not in current]
+        removed = sorted(current.difference(wanted))
+        if removed:
+            link_model.objects.filter(**{owner_field: owner_id, target_field + '__in': removed}).delete()
+        if added:
+            link_model.objects.bulk_create([
+                link_model(**{owner_field: owner_id, target_field: target_id}) for target_id in added
+            ])
+    return {'added': added, 'removed': removed, 'ignored': ignored}
@@ -0,0 +1,33 @@
+"""
+批量关联数据加载
+列表接口需要为每一行附带关联数据（如用户的角色列表）时，不要逐行查询（N+1），
+而是收集本页所有主键，用一次 IN 查询批量读取，再在内存中分组挂到各行上。
+"""
+from collections import defaultdict
+
+
+def group_by(items, key):
+    """
+    按 key 函数把 items 分组，组内保持原有顺序
+    """
+    grouped = defaultdict(list)
+    for item in items:
+        grouped[key(item)].append(item)
+    return grouped
+
+
+def attach_related(rows, field, loader, key='id', default=list):
+    """
+    为 rows（字典列表）批量附带关联数据
+    :param rows: 列表接口的行数据
+    :param field: 写入每行的字段名，如 'roleList'
+    :param loader: 接收主键列表、返回 {主键: 关联数据} 的函数，只会被调用一次
+    :param key: 行中作为主键的字段
+    :param default: 没有关联数据时的默认值工厂
+    :return: rows
+    """
+    related = loader([row[key] for row in rows]) if rows else {}
+    for row in rows:
+        value = related.get(row[key])
+        row[field] = value if value is not None else default()
+    return rows
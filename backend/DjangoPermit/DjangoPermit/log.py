@@ -0,0 +1,181 @@
+"""
+结构化日志
+业务代码只调用 logging（logger = logging.getLogger(__name__)），日志记录先经过过滤器：
+  SampleFilter  按 logger 名称对 DEBUG 记录抽样，高频调试日志只保留一部分
+  RedactFilter  把密码、token、Authorization 等敏感字段替换成 ***
+再由 QueueHandler 放进内存队列立即返回，后台线程（QueueListener）负责格式化成一行 JSON 并写到 stdout，
+请求线程不再因为同步写 stdout 而阻塞。
+settings.LOGGING_CONFIG 指向本模块的 configure，它在 dictConfig 之后启动队列的后台线程。
+"""
+import atexit
+import logging
+import logging.config
+import logging.handlers
+import os
+import random
+import re
+from datetime import datetime, timezone
+
+from DjangoPermit.http import dumps
+
+# 值需要脱敏的字段名（小写，包含即匹配，如 newPassword、access_token）
+SENSITIVE_KEYS = ('password', 'passwd', 'token', 'authorization', 'secret', 'cookie', 'refresh', 'access')
+MASK = '***'
+
+_TEXT_PATTERNS = [
+    # Authorization: Bearer <token>
+    (re.compile(r'(Bearer\s+)[\w\-.~+/=]+', re.IGNORECASE), r'\1' + MASK),
+    # JWT
+    (re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]+'), MASK),
+    # "password": "xxx"、password=xxx、'token': 'xxx'
+    (re.compile(r'''(["']?[\w-]*(?:%s)[\w-]*["']?\s*[:=]\s*)(b?["']?)[^"'&,\s}]*''' % '|'.join(SENSITIVE_KEYS),
+                re.IGNORECASE), r'\1\2' + MASK),
+]
+
+# LogRecord 自带的属性，其余属性都是通过 extra 传入的字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def is_sensitive(key):
+    key = str(key).lower()
+    return any(name in key for name in SENSITIVE_KEYS)
+
+
+def redact_text(text):
+    for pattern, replacement in _TEXT_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def redact(value):
+    """
+    递归脱敏：字典中敏感字段的值替换成 ***，字符串中的 token、密码替换成 ***
+    """
+    if isinstance(value, dict):
+        return {key: MASK if is_sensitive(key) else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    if isinstance(value, str):
+        return redact_text(value)
+    return value
+
+
+def extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class RedactFilter(logging.Filter):
+    """
+    脱敏：先把消息格式化好再处理，extra 字段按字段名和内容处理
+    """
+
+    def filter(self, record):
+        record.msg = redact_text(record.getMessage())
+        record.args = None
+        for key, value in extra_fields(record).items():
+            setattr(record, key, MASK if is_sensitive(key) else redact(value))
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """
+    按 logger 名称对 DEBUG 记录抽样
+    :param rates: {logger 名称前缀: 保留比例}，如 {'user.views': 0.01} 只保留 1% 的 user.views 调试日志
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        # 最长的前缀优先匹配
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    每条记录输出一行 JSON：time、level、logger、message，extra 字段，以及异常堆栈 exc
+    """
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        data.update(extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return dumps(data).decode('utf-8')
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    放入队列前在调用线程里把消息和异常堆栈转成字符串（后台线程处理时异常对象、参数可能已经变化），
+    与标准库不同的是不把堆栈拼接进 message，交给 JsonFormatter 单独输出
+    """
+
+    _formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listeners = []
+
+
+def _start_listeners():
+    for name in logging.getHandlerNames():
+        handler = logging.getHandlerByName(name)
+        listener = getattr(handler, 'listener', None)
+        if isinstance(handler, logging.handlers.QueueHandler) and listener is not None:
+            listener.start()
+            _listeners.append(listener)
+
+
+def stop_listeners():
+    """
+    停止后台线程，队列中剩余的日志写完后返回
+    """
+    while _listeners:
+        listener = _listeners.pop()
+        if listener._thread is not None:
+            listener.stop()
+
+
+def _restart_listeners_in_child():
+    # fork 出的子进程（gunicorn --preload）没有父进程的后台线程，需要重新启动
+    for listener in _listeners:
+        listener._thread = None
+        listener.start()
+
+
+def configure(logging_settings):
+    """
+    settings.LOGGING_CONFIG：按 LOGGING 配置日志，并启动队列的后台线程
+    """
+    stop_listeners()
+    logging.config.dictConfig(logging_settings)
+    _start_listeners()
+
+
+atexit.register(stop_listeners)
+os.register_at_fork(after_in_child=_restart_listeners_in_child)
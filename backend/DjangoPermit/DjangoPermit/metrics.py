@@ -0,0 +1,225 @@
+"""
+请求耗时统计
+MetricsMiddleware 为每个请求记录：总耗时、数据库查询次数和耗时（connection.execute_wrapper）、
+JSON 编码耗时（DjangoPermit.http.dumps）、密码哈希耗时（user.hashing），按路由累计到固定分桶的直方图中。
+GET /metrics 以 Prometheus 文本格式输出（只允许 METRICS_ALLOWED_IPS 访问），
+SERVER_TIMING 打开时同样的耗时写到响应头 Server-Timing，浏览器开发者工具里可以直接看到。
+统计数据在进程内，多个 worker 进程各自统计，输出中带 pid 标签。
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views import View
+
+from DjangoPermit.db_backends.mysql_pool.pool import pool_stats
+
+# 耗时分桶（秒）
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 查询次数分桶
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# (指标名, 说明, 分桶, 取值函数)
+HISTOGRAMS = (
+    ('request_duration_seconds', '请求总耗时', DURATION_BUCKETS, lambda timings: timings.total),
+    ('db_queries', '每个请求的数据库查询次数', QUERY_BUCKETS, lambda timings: timings.queries),
+    ('db_duration_seconds', '每个请求的数据库查询耗时', DURATION_BUCKETS, lambda timings: timings.spans['db']),
+    ('json_encode_seconds', '每个请求的 JSON 编码耗时', DURATION_BUCKETS, lambda timings: timings.spans['json']),
+    ('password_hash_seconds', '每个请求的密码哈希耗时', DURATION_BUCKETS, lambda timings: timings.spans['hash']),
+)
+PREFIX = 'djangopermit_'
+
+_current = ContextVar('request_timings', default=None)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    {(指标名, 路由): Histogram}
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, timings):
+        with self._lock:
+            for name, _, buckets, value in HISTOGRAMS:
+                histogram = self._histograms.get((name, route))
+                if histogram is None:
+                    histogram = self._histograms[(name, route)] = Histogram(buckets)
+                histogram.observe(value(timings))
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """
+        Prometheus 文本格式
+        """
+        pid = os.getpid()
+        lines = []
+        with self._lock:
+            for name, help_text, buckets, _ in HISTOGRAMS:
+                metric = PREFIX + name
+                lines.append('# HELP %s %s' % (metric, help_text))
+                lines.append('# TYPE %s histogram' % metric)
+                for (histogram_name, route), histogram in sorted(self._histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    labels = 'route="%s",pid="%d"' % (_escape(route), pid)
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append('%s_bucket{%s,le="%s"} %d' % (metric, labels, bound, cumulative))
+                    lines.append('%s_sum{%s} %r' % (metric, labels, histogram.sum))
+                    lines.append('%s_count{%s} %d' % (metric, labels, histogram.count))
+        for alias, stats in pool_stats().items():
+            labels = 'alias="%s",pid="%d"' % (_escape(alias), pid)
+            for key in ('connections', 'idle', 'checked_out', 'checkouts', 'created', 'timeouts', 'waits', 'wait_time'):
+                lines.append('%sdb_pool_%s{%s} %r' % (PREFIX, key, labels, stats[key]))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestTimings:
+    """
+    一个请求的耗时
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total = 0.0
+        self.queries = 0
+        self.spans = {'db': 0.0, 'json': 0.0, 'hash': 0.0}
+
+    def add(self, name, seconds):
+        self.spans[name] += seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.spans['db'] += time.perf_counter() - start
+
+    def server_timing(self):
+        return ', '.join([
+            'total;dur=%.2f' % (self.total * 1000),
+            'db;dur=%.2f;desc="%d queries"' % (self.spans['db'] * 1000, self.queries),
+            'json;dur=%.2f' % (self.spans['json'] * 1000),
+            'hash;dur=%.2f' % (self.spans['hash'] * 1000),
+        ])
+
+
+@contextmanager
+def timed(name):
+    """
+    把范围内的耗时计入当前请求的 name（json、hash），请求之外调用时不统计
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    需要放在 MIDDLEWARE 的第一位，统计的总耗时才包含其他中间件
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token, stack = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stack.close()
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token, stack = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stack.close()
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    def _start(self):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timings.execute_wrapper))
+        return timings, token, stack
+
+    def _finish(self, request, response, timings):
+        timings.total = time.perf_counter() - timings.start
+        match = request.resolver_match
+        route = match.route if match is not None else '<unmatched>'
+        registry.observe(route, timings)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = timings.server_timing()
+        return response
+
+
+# 反向代理添加的请求头：经 Nginx 转发的请求 REMOTE_ADDR 是 127.0.0.1，只能靠这些头识别
+PROXY_HEADERS = ('HTTP_X_FORWARDED_FOR', 'HTTP_X_REAL_IP', 'HTTP_FORWARDED')
+
+
+class MetricsView(View):
+    """
+    Prometheus 抓取接口
+    只接受直接连到后端、来源 IP 在 METRICS_ALLOWED_IPS 中的请求；经反向代理转发的请求一律拒绝，
+    否则外部请求经 Nginx 转发后来源是 127.0.0.1，会被当成本机
+    """
+
+    def get(self, request):
+        if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+            return HttpResponseForbidden()
+        if any(header in request.META for header in PROXY_HEADERS):
+            return HttpResponseForbidden()
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,137 @@
+"""
+游标（keyset）分页
+Paginator 每页都要 COUNT(*) 再 OFFSET 扫描，大表深分页会越来越慢。
+游标分页按 (排序列, id) 记住上一页最后一行的位置，下一页用 WHERE (排序列, id) > (上一页最后的值) 直接定位，
+每页的代价只与页大小有关。游标对客户端是不透明的字符串。
+总数是可选的：需要精确总数时才 COUNT(*)，否则在没有筛选条件时返回表统计信息中的近似行数。
+"""
+import base64
+import json
+
+from django.db import connection
+from django.db.models import Q
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(order_by, value, pk):
+    payload = json.dumps({'o': order_by, 'v': value, 'id': pk}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, order_by):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value, pk = payload['v'], payload['id']
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise CursorError('游标格式错误')
+    if payload.get('o') != order_by:
+        raise CursorError('游标与排序方式不一致')
+    return value, pk
+
+
+def keyset_paginate(queryset, page_size, cursor=None, order_by='id'):
+    """
+    按游标取一页数据
+    :param queryset: .values() 查询集，必须包含 id 和排序列
+    :param page_size: 每页条数
+    :param cursor: 上一页返回的 nextCursor，首页为空
+    :param order_by: 排序列，'-' 开头表示降序；排序列必须非空，非唯一列会自动以 id 作为第二排序
+    :return: (本页数据列表, 下一页游标；没有下一页时为 None)
+    """
+    descending = order_by.startswith('-')
+    field = order_by.lstrip('-')
+    prefix = '-' if descending else ''
+    if field == 'id':
+        queryset = queryset.order_by(prefix + 'id')
+    else:
+        queryset = queryset.order_by(prefix + field, prefix + 'id')
+
+    if cursor:
+        value, pk = decode_cursor(cursor, order_by)
+        lookup = 'lt' if descending else 'gt'
+        if field == 'id':
+            condition = Q(**{'id__' + lookup: pk})
+        else:
+            condition = Q(**{field + '__' + lookup: value}) | Q(**{field: value, 'id__' + lookup: pk})
+        queryset = queryset.filter(condition)
+
+    # 多取一条，用来判断是否还有下一页
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(order_by, last[field], last['id'])
+    return rows, next_cursor
+
+
+def approximate_count(model):
+    """
+    从数据库的表统计信息读取近似行数，不扫描表
+    MySQL 读 information_schema.TABLES.TABLE_ROWS；SQLite 读 ANALYZE 生成的 sqlite_stat1，
+    没有统计信息时退回 COUNT(*)
+    :return: (行数, 是否为近似值)
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table]
+            )
+            row = cursor.fetchone()
+            if row and row[0] is not None:
+                return int(row[0]), True
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                # 每行 stat 的第一个数都是表的行数（无论是表本身还是某个索引的统计）
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                row = cursor.fetchone()
+                if row and row[0]:
+                    return int(row[0].split()[0]), True
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            row = cursor.fetchone()
+            if row and row[0] is not None and row[0] >= 0:
+                return int(row[0]), True
+    return model._default_manager.count(), False
+
+
+def cursor_page(queryset, data, page_size, orderings, filtered, count=None):
+    """
+    列表接口的游标分页模式
+    :param queryset: 已加好筛选条件的 .values() 查询集
+    :param data: 请求参数，使用其中的 cursor、orderBy、withTotal
+    :param orderings: 允许的排序列（白名单）
+    :param filtered: 是否带有筛选条件（有筛选条件时近似总数没有意义，不返回）
+    :param count: 计算精确总数的函数，默认 queryset.count
+    :return: (本页数据列表, 分页信息字典)
+    """
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        raise CursorError('pageSize 必须是整数')
+    if page_size < 1:
+        raise CursorError('pageSize 必须大于 0')
+    order_by = str(data.get('orderBy') or 'id')
+    if order_by not in orderings and not (order_by.startswith('-') and order_by[1:] in orderings):
+        raise CursorError(f'不支持的排序列: {order_by}')
+    rows, next_cursor = keyset_paginate(queryset, page_size, data.get('cursor'), order_by)
+    if data.get('withTotal'):
+        total, approximate = (count or queryset.count)(), False
+    elif not filtered:
+        total, approximate = approximate_count(queryset.model)
+    else:
+        total, approximate = None, False
+    return rows, {
+        'nextCursor': next_cursor,
+        'total': total,
+        'totalApproximate': approximate,
+        'pageSize': page_size,
+        'orderBy': order_by,
+    }
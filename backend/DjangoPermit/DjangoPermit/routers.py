@@ -0,0 +1,193 @@
+"""
+主从读写分离
+写操作和默认的读操作都走主库（default）；用 read_from_replica 装饰的只读接口把读操作发往 REPLICA_DATABASES 中的从库。
+以下情况读操作仍然走主库（读到自己刚写的数据）：
+  1. 同一个请求里已经有过写操作；
+  2. 当前用户在 REPLICA_STICKY_SECONDS 秒内有过写操作（覆盖主从复制延迟）；
+  3. 在 use_primary() 范围内（例如结果会写入缓存的查询，避免把从库的旧数据缓存起来）；
+  4. 没有可用的从库；
+  5. 默认缓存不在进程之间共享（LocMemCache 等）：第 2 条的标记存放在缓存中，
+     写请求和随后的读请求可能落在不同的 worker 进程，只有共享缓存（DJANGO_REDIS_URL）才能保证读到自己的写入。
+从库按权重随机选择，每个请求只选一次；每个进程每隔 REPLICA_HEALTH_CHECK_INTERVAL 秒检查一次从库能否连接，
+连不上的从库在下次检查前不再使用。
+请求之外（管理命令、后台线程）不做路由，全部走主库。
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.deprecation import MiddlewareMixin
+
+from DjangoPermit.versions import cache_is_shared
+
+logger = logging.getLogger(__name__)
+
+STICKY_KEY = 'db:sticky:%s'
+
+_state = ContextVar('db_routing_state', default=None)
+
+# 从库健康状态：{别名: (是否可用, 检查时间)}
+_health = {}
+_health_lock = threading.Lock()
+
+_replica_disabled_warned = False
+
+
+class RoutingState:
+    """
+    一个请求的路由状态
+    """
+
+    def __init__(self, user_id=None):
+        self.user_id = user_id
+        self.replica_allowed = False  # 是否在 read_from_replica 范围内
+        self.primary_pinned = False  # 本请求是否固定读主库
+        self.wrote = False  # 本请求是否有写操作
+        self.replica = None  # 本请求选中的从库
+
+
+def replica_healthy(alias):
+    """
+    从库是否可用，检查结果在当前进程内缓存 REPLICA_HEALTH_CHECK_INTERVAL 秒
+    """
+    now = time.monotonic()
+    healthy, checked_at = _health.get(alias, (True, None))
+    if checked_at is not None and now - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        return healthy
+    with _health_lock:
+        healthy, checked_at = _health.get(alias, (True, None))
+        if checked_at is not None and now - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return healthy
+        try:
+            connections[alias].ensure_connection()
+            healthy = True
+        except DatabaseError:
+            healthy = False
+            logger.warning("从库 %s 无法连接，%s 秒内读操作改走主库", alias, settings.REPLICA_HEALTH_CHECK_INTERVAL)
+        _health[alias] = (healthy, now)
+    return healthy
+
+
+def choose_replica():
+    """
+    按权重随机选择一个可用的从库，没有可用从库时返回 None
+    """
+    candidates = [(alias, weight) for alias, weight in settings.REPLICA_DATABASES.items() if weight > 0]
+    if not candidates:
+        return None
+    healthy = [(alias, weight) for alias, weight in candidates if replica_healthy(alias)]
+    if not healthy:
+        return None
+    aliases, weights = zip(*healthy)
+    return random.choices(aliases, weights=weights)[0]
+
+
+class PrimaryReplicaRouter:
+    """
+    数据库路由（settings.DATABASE_ROUTERS）
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_allowed or state.primary_pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if state.replica is None:
+            state.replica = choose_replica() or DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 主库和从库的数据相同
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 从库的表结构由复制同步，不作限制（测试时两个 SQLite 库都需要建表）
+        return None
+
+
+@contextmanager
+def use_primary():
+    """
+    范围内的读操作固定走主库
+    """
+    state = _state.get()
+    if state is None or state.primary_pinned:
+        yield
+        return
+    state.primary_pinned = True
+    try:
+        yield
+    finally:
+        state.primary_pinned = False
+
+
+def replicas_enabled():
+    """
+    是否启用从库：配置了从库，且写后读主库的标记能被所有 worker 进程看到（共享缓存）
+    """
+    global _replica_disabled_warned
+    if not settings.REPLICA_DATABASES:
+        return False
+    if cache_is_shared():
+        return True
+    if not _replica_disabled_warned:
+        _replica_disabled_warned = True
+        logger.warning("默认缓存不在进程之间共享，无法保证写后读到自己的数据，读操作全部走主库；请配置 DJANGO_REDIS_URL")
+    return False
+
+
+def read_from_replica(view_func):
+    """
+    视图装饰器：视图中的读操作可以走从库
+    配合 method_decorator 使用：@method_decorator(read_from_replica, name='dispatch')
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None or not replicas_enabled():
+            return view_func(request, *args, **kwargs)
+        if state.user_id is not None and not state.primary_pinned and cache.get(STICKY_KEY % state.user_id):
+            state.primary_pinned = True
+        state.replica_allowed = True
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            state.replica_allowed = False
+
+    return wrapper
+
+
+class DatabaseRoutingMiddleware(MiddlewareMixin):
+    """
+    为每个请求建立路由状态；请求中有写操作时，在 REPLICA_STICKY_SECONDS 秒内把该用户的读操作固定到主库。
+    需要放在 JwtAuthenticationMiddleware 之后（用到 request.user_id）。
+    """
+
+    def process_request(self, request):
+        request.db_routing = RoutingState(getattr(request, 'user_id', None))
+        _state.set(request.db_routing)
+
+    def process_response(self, request, response):
+        state = getattr(request, 'db_routing', None)
+        if state is None:
+            return response
+        if state.wrote and state.user_id is not None and settings.REPLICA_DATABASES:
+            cache.set(STICKY_KEY % state.user_id, True, timeout=settings.REPLICA_STICKY_SECONDS)
+        _state.set(None)
+        return response
@@ -42,13 +42,16 @@ INSTALLED_APPS = [
     'user.apps.UserConfig',
     'menu.apps.MenuConfig',
     'role.apps.RoleConfig',
+    'search.apps.SearchConfig',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
 ]
 
 MIDDLEWARE = [
+    'DjangoPermit.metrics.MetricsMiddleware',  # 请求耗时统计（放在第一位，总耗时包含其他中间件）
     'django.middleware.security.SecurityMiddleware',
+    'DjangoPermit.compression.CompressionMiddleware',  # 响应压缩（br/gzip），需要在读写响应体的中间件之前
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS 中间件（必须在 CommonMiddleware 之前）
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +60,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'user.middleware.JwtAuthenticationMiddleware',
+    'user.middleware.PermissionMiddleware',  # 接口权限校验（必须在 JwtAuthenticationMiddleware 之后）
+    'DjangoPermit.routers.DatabaseRoutingMiddleware',  # 主从读写分离的请求状态（用到 JwtAuthenticationMiddleware 设置的 user_id）
 ]
 
 ROOT_URLCONF = 'DjangoPermit.urls'
@@ -86,16 +91,57 @@ WSGI_APPLICATION = 'DjangoPermit.wsgi.application'
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
 # 数据库要单独创建好之后再执行程序。生产环境可用环境变量覆盖：DJANGO_DB_NAME, DJANGO_DB_USER, DJANGO_DB_PASSWORD, DJANGO_DB_HOST, DJANGO_DB_PORT
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': os.environ.get('DJANGO_DB_NAME', 'db_admin'),
-        'USER': os.environ.get('DJANGO_DB_USER', 'hualj'),
-        'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', '123456'),
-        'HOST': os.environ.get('DJANGO_DB_HOST', '127.0.0.1'),
-        'PORT': os.environ.get('DJANGO_DB_PORT', '3306'),
+# 本地运行测试可设置 DJANGO_DB_ENGINE=sqlite 改用 SQLite（db.sqlite3），无需 MySQL：
+#   DJANGO_DB_ENGINE=sqlite python manage.py test
+# 只读接口可以走的从库 {别名: 权重}，见 DjangoPermit/routers.py
+REPLICA_DATABASES = {}
+if os.environ.get('DJANGO_DB_ENGINE', 'mysql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        },
+        # 本地模拟从库（只有加入 REPLICA_DATABASES 才会被使用，测试中用来验证读写分离）
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db_replica.sqlite3',
+        },
     }
-}
+else:
+    # 带连接池的 MySQL 后端（DjangoPermit/db_backends/mysql_pool），请求结束时把连接归还到进程内连接池，
+    # 不再每个请求重新握手认证。DJANGO_DB_POOL=False 时退回每个请求新建连接。
+    DATABASES = {
+        'default': {
+            'ENGINE': 'DjangoPermit.db_backends.mysql_pool',
+            'NAME': os.environ.get('DJANGO_DB_NAME', 'db_admin'),
+            'USER': os.environ.get('DJANGO_DB_USER', 'hualj'),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', '123456'),
+            'HOST': os.environ.get('DJANGO_DB_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('DJANGO_DB_PORT', '3306'),
+            'CONN_MAX_AGE': 0,
+            'POOL': {
+                'ENABLED': os.environ.get('DJANGO_DB_POOL', 'True').lower() in ('1', 'true', 'yes'),
+                'SIZE': int(os.environ.get('DJANGO_DB_POOL_SIZE', '10')),  # 每个进程常驻的连接数
+                'MAX_OVERFLOW': int(os.environ.get('DJANGO_DB_POOL_MAX_OVERFLOW', '10')),  # 高峰期额外允许的连接数
+                'TIMEOUT': 10,  # 连接全部借出时最多等待的秒数
+                'RECYCLE': 3600,  # 连接最长存活秒数，需小于 MySQL 的 wait_timeout（默认 8 小时）
+                'PRE_PING': True,  # 借出前 ping 一次空闲超过 PING_IDLE 秒的连接
+                'PING_IDLE': 5,
+            },
+        }
+    }
+    # 从库：DJANGO_DB_REPLICA_HOSTS=主机[:端口][*权重]，逗号分隔，例如 10.0.0.2*2,10.0.0.3:3307
+    # 帐号、库名与主库相同；别名依次为 replica1、replica2 ...
+    for index, item in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICA_HOSTS', '').split(',')), start=1):
+        address, _, weight = item.strip().partition('*')
+        host, _, port = address.partition(':')
+        DATABASES['replica%d' % index] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+        REPLICA_DATABASES['replica%d' % index] = int(weight or 1)
 
 
 # Password validation
@@ -167,6 +213,10 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),  # 用于验证 token 的 HTTP 头部类型，默认是 ('Bearer',)。也可以添加其他类型如 'JWT'。
 }
 
+# JwtAuthenticationMiddleware 已验证 token 的缓存
+JWT_TOKEN_CACHE_SIZE = 10000  # 最多缓存的 token 数
+JWT_TOKEN_CACHE_TTL = 300  # 缓存有效期（秒），同时不会超过 token 自身的 exp
+
 # ============================================
 # CORS 跨域配置
 # ============================================
@@ -209,4 +259,146 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_PREFLIGHT_MAX_AGE = 86400
 
 MEDIA_ROOT = BASE_DIR / 'media'
-MEDIA_URL = 'media/'
\ No newline at end of file
+MEDIA_URL = 'media/'
+
+# ============================================
+# 缓存
+# ============================================
+# 权限缓存、菜单快照、接口权限索引、列表总数和读写分离都依赖缓存中的版本号失效，版本号必须在所有 worker 进程之间共享：
+# 多进程部署（gunicorn -w 4 等）必须设置 DJANGO_REDIS_URL（如 redis://127.0.0.1:6379/0），
+# 否则一个进程修改角色、菜单后，其他进程仍按旧版本号使用旧的权限。
+# 未设置时使用进程内的本地内存缓存，只适用于单进程运行（runserver、测试、单进程 waitress）；
+# python manage.py check --deploy 会对此给出警告
+_redis_url = os.environ.get('DJANGO_REDIS_URL')
+if _redis_url:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': _redis_url,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# ============================================
+# 权限缓存配置
+# ============================================
+# 用户的角色组合、角色组合的权限集合（菜单ID、权限标识、菜单树）先查进程内 LRU，再查 Django 缓存（CACHES）
+PERMISSION_CACHE_SIZE = int(os.environ.get('DJANGO_PERMISSION_CACHE_SIZE', '4096'))  # 进程内 LRU 最多缓存的用户数
+ROLE_COMBO_CACHE_SIZE = int(os.environ.get('DJANGO_ROLE_COMBO_CACHE_SIZE', '256'))  # 进程内 LRU 最多缓存的角色组合数
+# 进程内 LRU 条目的有效期（秒）：版本号递增后缓存键随之变化，正常情况下不需要等待过期，
+# 有效期只是兜底，万一某次失效没有生效（版本号被缓存淘汰等），旧的权限最多在本进程内保留这么久
+PERMISSION_LOCAL_CACHE_TTL = 30
+PERMISSION_CACHE_TIMEOUT = 3600  # Django 缓存中的过期时间（秒）
+
+# ============================================
+# 密码哈希线程池
+# ============================================
+# 异步视图中的密码校验/加密在该线程池中执行，限制 PBKDF2 占用的 CPU，避免阻塞事件循环
+PASSWORD_HASH_WORKERS = int(os.environ.get('DJANGO_PASSWORD_HASH_WORKERS', os.cpu_count() or 4))
+# 批量导入、批量重置密码使用单独的线程池，大批量哈希不会占满登录用的线程池；默认 CPU 核数的一半
+PASSWORD_BULK_HASH_WORKERS = int(os.environ.get('DJANGO_PASSWORD_BULK_HASH_WORKERS', max(1, (os.cpu_count() or 4) // 2)))
+# 重置密码（单个、批量）后的默认密码，生产环境通过环境变量设置
+RESET_PASSWORD = os.environ.get('DJANGO_RESET_PASSWORD', 'hualijun123')
+
+# ============================================
+# 接口权限配置
+# ============================================
+# 路由 <模块>/<路由名称> 默认需要权限标识 <模块>:<路由名称>（如 user:delete、role:assignPermission），
+# 默认拒绝：sys_menu 中没有配置该权限标识（一般是按钮类型的菜单）时，只有超级管理员角色可以访问。
+# python manage.py sync_route_permissions 为每个路由创建对应的按钮菜单，再在角色管理中分配。
+# 这里为个别路由指定其他权限标识，新增的派生接口沿用已有接口的权限
+ROUTE_PERMISSIONS = {
+    'user:export': 'user:search',
+    'user:import': 'user:save',
+    # 批量操作沿用对应单个操作的权限
+    'user:batchUpdateStatus': 'user:updateStatus',
+    'user:batchDelete': 'user:delete',
+    'user:batchResetPassword': 'user:resetPassword',
+    'role:export': 'role:search',
+    'menu:export': 'menu:search',
+}
+# 登录即可访问、不需要权限标识的路由（个人中心）
+AUTHENTICATED_ROUTES = ['user:updateUserPwd', 'user:uploadImage', 'user:updateAvatar']
+# 拥有这些角色编码的用户不受接口权限限制
+PERMISSION_SUPERUSER_ROLE_CODES = ['admin']
+
+# ============================================
+# 搜索配置
+# ============================================
+# 用户名、角色名搜索使用的后端：like（LIKE 全表扫描）、ngram（sys_search_gram 片段索引）、mysql_fulltext（MySQL 全文索引）
+# 切换到 ngram 之前先执行 python manage.py rebuild_search_index 建立已有数据的索引
+# mysql_fulltext 的全文索引只在迁移时已选择该后端才会创建，之后再切换的执行 python manage.py rebuild_search_index --backend mysql_fulltext
+SEARCH_BACKEND = os.environ.get('DJANGO_SEARCH_BACKEND', 'like')
+
+# ============================================
+# 列表总数缓存
+# ============================================
+# 用户、角色列表的总数按 (接口, 筛选条件, 表版本号) 缓存，sys_user / sys_role 有写入时失效
+COUNT_CACHE_TIMEOUT = 3600
+# 开启后，表版本变化后的第一次请求先返回上一次的总数（可能略微过期），在后台线程中重新计算
+COUNT_CACHE_ASYNC_REFRESH = os.environ.get('DJANGO_COUNT_CACHE_ASYNC_REFRESH', 'False').lower() in ('1', 'true', 'yes')
+
+# ============================================
+# 响应压缩
+# ============================================
+# 小于该字节数的响应不压缩
+COMPRESSION_MIN_SIZE = 1024
+# brotli 压缩级别（0~11），动态响应用中等级别兼顾速度和压缩率；未安装 brotli 时只用 gzip
+COMPRESSION_BROTLI_QUALITY = 5
+
+# ============================================
+# 主从读写分离
+# ============================================
+DATABASE_ROUTERS = ['DjangoPermit.routers.PrimaryReplicaRouter']
+# 用户有写操作后，多少秒内的读操作固定走主库（需大于主从复制延迟）
+REPLICA_STICKY_SECONDS = 5
+# 每个进程检查从库能否连接的间隔（秒）
+REPLICA_HEALTH_CHECK_INTERVAL = 10
+
+# ============================================
+# 日志
+# ============================================
+# 业务模块的日志经过抽样、脱敏后放入队列，由后台线程以 JSON 行写到 stdout，见 DjangoPermit/log.py
+LOG_LEVEL = os.environ.get('DJANGO_LOG_LEVEL', 'INFO').upper()
+LOGGING_CONFIG = 'DjangoPermit.log.configure'
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'DjangoPermit.log.JsonFormatter'},
+    },
+    'filters': {
+        # DEBUG 日志按 logger 抽样 {logger 名称前缀: 保留比例}，例如 {'user.views': 0.01}
+        'sample': {'()': 'DjangoPermit.log.SampleFilter', 'rates': {}},
+        'redact': {'()': 'DjangoPermit.log.RedactFilter'},
+    },
+    'handlers': {
+        'stdout': {
+            'class': 'logging.StreamHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json',
+        },
+        'queue': {
+            'class': 'DjangoPermit.log.QueueHandler',
+            'handlers': ['stdout'],
+            'filters': ['sample', 'redact'],
+        },
+    },
+    'loggers': {
+        name: {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False}
+        for name in ('DjangoPermit', 'user', 'role', 'menu', 'search')
+    },
+}
+
+# ============================================
+# 耗时统计
+# ============================================
+# 允许访问 /metrics（Prometheus 文本格式）的客户端 IP
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('DJANGO_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+# 打开后每个响应带 Server-Timing 头（总耗时、数据库、JSON 编码、密码哈希），默认跟随 DEBUG
+SERVER_TIMING = os.environ.get('DJANGO_SERVER_TIMING', str(DEBUG)).lower() in ('1', 'true', 'yes')
@@ -0,0 +1,144 @@
+"""
+查询次数回归测试的基类
+在不同的数据量下请求同一个接口，断言查询次数：大多数接口应与数据量无关，
+分块处理的接口（导出、批量操作）按块数有上界。只依赖 SQLite，不需要 MySQL 和网络。
+请求以普通用户（非超级管理员）的身份发出，其角色拥有全部接口权限和随数据量增长的菜单，
+权限中间件走完整的校验流程；cold=True 时清空全部缓存、不预热，统计冷启动（登录、首个请求）的查询次数。
+"""
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from menu.models import SysMenu, SysRoleMenu
+from role.models import SysRole, SysUserRole
+from user.models import SysUser
+
+ADMIN_PASSWORD = '123456'
+
+
+def clear_caches():
+    """
+    清空 Django 缓存和各进程内缓存（token、权限、接口权限索引、菜单快照），模拟刚启动的 worker 进程
+    """
+    from menu import authorization, permission, snapshot
+    from user.middleware import _token_cache
+    cache.clear()
+    _token_cache.clear()
+    permission._user_cache.local.clear()
+    permission._combo_cache.local.clear()
+    authorization._index = None
+    snapshot._snapshot = None
+
+
+def create_admin(username='python222', password=ADMIN_PASSWORD):
+    """
+    创建拥有超级管理员角色（编码 admin）的用户
+    接口权限默认拒绝，只测试接口本身的行为时用它访问
+    """
+    role, _ = SysRole.objects.get_or_create(code='admin', defaults={'name': '超级管理员'})
+    admin = SysUser.objects.create(username=username, password=password)
+    SysUserRole.objects.create(user=admin, role=role)
+    return admin
+
+
+# 测试只关心查询次数，用最快的哈希算法
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryCountTestCase(TestCase):
+    # 依次增长到的数据量：用户数、角色数、菜单数（以及每页条数、批量操作的ID数）
+    SIZES = (10, 1000)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_role = SysRole.objects.create(name='超级管理员', code='admin')
+        cls.role = SysRole.objects.create(name='普通角色', code='common')
+        cls.other_role = SysRole.objects.create(name='审计角色', code='audit')
+        cls.admin = SysUser(username='python222')
+        cls.admin.set_password(ADMIN_PASSWORD)
+        cls.admin.save()
+        SysUserRole.objects.create(user=cls.admin, role=cls.admin_role)
+        # 发出请求的普通用户：普通角色拥有每个接口对应的按钮权限，让权限中间件走完整的校验流程
+        cls.operator = SysUser(username='operator')
+        cls.operator.set_password(ADMIN_PASSWORD)
+        cls.operator.save()
+        SysUserRole.objects.create(user=cls.operator, role=cls.role)
+        buttons = SysMenu.objects.bulk_create([
+            SysMenu(name=perm, parent_id=0, order_num=0, menu_type='F', perms=perm)
+            for perm in cls.route_perms()
+        ])
+        SysRoleMenu.objects.bulk_create([SysRoleMenu(role=cls.role, menu=menu) for menu in buttons])
+        cls.token = str(RefreshToken.for_user(cls.operator).access_token)
+
+    @staticmethod
+    def route_perms():
+        from menu.authorization import route_permissions
+        return sorted({perm for perm in route_permissions().values() if perm})
+
+    def setUp(self):
+        self.size = 0
+        self.users = []
+        self.roles = []
+        self.menus = []
+
+    def grow(self, size):
+        """
+        把用户、角色、菜单各增加到 size 个：每个用户有两个角色，普通角色拥有全部菜单
+        """
+        start, self.size = self.size, size
+        users = SysUser.objects.bulk_create([
+            SysUser(username='user%05d' % i, password='x', email='user%05d@example.com' % i, remark='测试用户')
+            for i in range(start, size)
+        ])
+        roles = SysRole.objects.bulk_create([
+            SysRole(name='角色%05d' % i, code='role%05d' % i) for i in range(start, size)
+        ])
+        menus = SysMenu.objects.bulk_create([
+            SysMenu(name='菜单%05d' % i, parent_id=0, order_num=i, path='/menu%d' % i, menu_type='C')
+            for i in range(start, size)
+        ])
+        SysUserRole.objects.bulk_create(
+            [SysUserRole(user=user, role=role) for user in users for role in (self.role, self.other_role)]
+        )
+        SysRoleMenu.objects.bulk_create([SysRoleMenu(role=self.role, menu=menu) for menu in menus])
+        self.users += users
+        self.roles += roles
+        self.menus += menus
+
+    def request(self, method, path, data=None, **extra):
+        extra.setdefault('HTTP_AUTHORIZATION', 'Bearer ' + self.token)
+        if method == 'get':
+            return self.client.get(path, data, **extra)
+        if isinstance(data, dict):
+            return self.client.post(path, json.dumps(data), content_type='application/json', **extra)
+        return self.client.post(path, data, **extra)
+
+    def assertQueryCounts(self, expected, call, cold=False):
+        """
+        :param expected: 各数据量下的查询次数，整数表示与数据量无关，或 {数据量: 次数}
+        :param call: call(size) 发出请求并返回响应
+        :param cold: 为 True 时清空全部缓存后直接请求，统计中包含 token、权限、索引的加载
+        """
+        if isinstance(expected, int):
+            expected = dict.fromkeys(self.SIZES, expected)
+        counts = {}
+        for size in self.SIZES:
+            self.grow(size)
+            if cold:
+                clear_caches()
+            else:
+                # 清空缓存后先请求一次轻量接口，预热 token、权限缓存，只统计目标接口自身的查询
+                cache.clear()
+                self.request('get', '/menu/cacheStats')
+            with CaptureQueriesContext(connection) as queries:
+                response = call(size)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertEqual(response.status_code, 200)
+            if response.get('Content-Type') == 'application/json':
+                self.assertEqual(response.json().get('code'), 200, response.json())
+            counts[size] = len(queries)
+            sql = [query['sql'] for query in queries]
+        self.assertEqual(counts, expected, '\n'.join(sql))
@@ -19,12 +19,15 @@ from django.urls import path,include,re_path
 from DjangoPermit import settings
 from django.views.static import serve
 
+from DjangoPermit.metrics import MetricsView
+
 
 urlpatterns = [
     # path('admin/', admin.site.urls),
     path('user/', include('user.urls')),  # 用户模块
     path('role/', include('role.urls')),  # 角色模块
     path('menu/', include('menu.urls')),  # 菜单模块
+    path('metrics', MetricsView.as_view(), name='metrics'),  # 耗时统计（Prometheus 文本格式）
 # 配置媒体文件的路由地址
     re_path('media/(?P<path>.*)', serve, {'document_root': settings.MEDIA_ROOT}, name='media')
 ]
@@ -0,0 +1,83 @@
+"""
+基于 Django 缓存框架的版本号
+缓存键里带上版本号，数据变更时只需递增版本号，旧的缓存条目自然失效。
+版本号缺失（首次使用或被缓存淘汰）时用当前时间（微秒）初始化，保证不会回到用过的旧值。
+只有 CACHES 使用 Redis 等多个进程共享的缓存时，各 worker 进程才能看到同一个版本号；
+本地内存缓存下每个进程各有一份版本号，一个进程中的递增其他进程看不到（check --deploy 会给出警告）。
+"""
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+
+KEY_PREFIX = 'version:'
+
+# 只在当前进程内有效的缓存后端
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """
+    缓存是否在多个进程之间共享
+    """
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [checks.Warning(
+        '默认缓存只在当前进程内有效，多进程部署时角色、菜单的变更不会同步到其他 worker 进程，'
+        '已撤销的权限在其他进程中仍然有效，列表总数也不会随写入更新；配置的从库也不会启用。',
+        hint='设置 DJANGO_REDIS_URL 使用 Redis 缓存，或只以单进程运行。',
+        id='DjangoPermit.W001',
+    )]
+
+
+def _initial_version():
+    return time.time_ns() // 1000
+
+
+def get_versions(names):
+    """
+    批量读取版本号（一次缓存往返）
+    :param names: 版本名列表
+    :return: {版本名: 版本号}
+    """
+    keys = [KEY_PREFIX + name for name in names]
+    values = cache.get_many(keys)
+    result = {}
+    for name, key in zip(names, keys):
+        value = values.get(key)
+        if value is None:
+            cache.add(key, _initial_version(), timeout=None)
+            value = cache.get(key)
+        result[name] = value
+    return result
+
+
+def get_version(name):
+    return get_versions([name])[name]
+
+
+def bump_version(name):
+    """
+    递增版本号，使依赖它的缓存全部失效
+    """
+    key = KEY_PREFIX + name
+    try:
+        return cache.incr(key)
+    except ValueError:
+        value = _initial_version()
+        cache.set(key, value, timeout=None)
+        return value
+
+
+def bump_versions(names):
+    for name in names:
+        bump_version(name)
@@ -0,0 +1,93 @@
+"""
+接口权限索引
+把 URLconf 中每个路由映射到访问它所需的权限标识（SysMenu.perms，通常是 menu_type='F' 的按钮）。
+路由 user/ 下名为 delete 的接口对应权限标识 user:delete，可通过 settings.ROUTE_PERMISSIONS 映射到其他权限标识
+（例如批量接口使用对应单条接口的权限）。默认拒绝：每个模块路由都需要权限标识，
+即使 sys_menu 中还没有配置该权限标识（此时只有超级管理员角色可以访问）；
+只有 settings.AUTHENTICATED_ROUTES 中的路由登录即可访问，没有名称、无法映射的模块路由一律拒绝。
+索引在首次请求时构建，角色变更后递增版本号，下一次请求时重建；请求热路径上不查数据库。
+"""
+import threading
+
+from django.conf import settings
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from DjangoPermit.versions import bump_version, get_version
+from role.models import SysRole
+
+INDEX_VERSION = 'perm:index'
+
+
+class AuthorizationIndex:
+
+    def __init__(self, version, route_perms, superuser_role_ids):
+        self.version = version
+        self.route_perms = route_perms  # {路由: 所需权限标识，None 表示登录即可访问}
+        self.superuser_role_ids = superuser_role_ids  # 拥有全部权限的角色
+
+
+def iter_routes(patterns=None, prefix=''):
+    """
+    遍历 URLconf，返回 (路由, 应用前缀, 路由名称)
+    路由与 request.resolver_match.route 的格式一致，例如 'user/delete'
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            app = prefix.strip('/').split('/')[0]
+            yield route, app, pattern.name
+
+
+def route_permissions():
+    """
+    每个路由所需的权限标识
+    :return: {路由: 权限标识}，不属于任何模块的路由（/metrics、/media）和 AUTHENTICATED_ROUTES 为 None
+    """
+    overrides = settings.ROUTE_PERMISSIONS
+    authenticated = set(settings.AUTHENTICATED_ROUTES)
+    route_perms = {}
+    for route, app, name in iter_routes():
+        key = '%s:%s' % (app, name)
+        if not app or key in authenticated:
+            route_perms[route] = None
+        else:
+            route_perms[route] = overrides.get(key, key)
+    return route_perms
+
+
+def build_authorization_index(version):
+    route_perms = route_permissions()
+    superuser_role_ids = frozenset(
+        SysRole.objects.filter(code__in=settings.PERMISSION_SUPERUSER_ROLE_CODES).values_list('id', flat=True)
+    )
+    return AuthorizationIndex(version, route_perms, superuser_role_ids)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_authorization_index():
+    """
+    获取当前版本的接口权限索引，版本变化时才重建
+    """
+    global _index
+    version = get_version(INDEX_VERSION)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = build_authorization_index(version)
+        return _index
+
+
+def invalidate_authorization_index():
+    """
+    角色（角色编码）变更后调用
+    """
+    bump_version(INDEX_VERSION)
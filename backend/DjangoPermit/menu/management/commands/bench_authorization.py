@@ -0,0 +1,68 @@
+"""
+接口权限校验的单次请求开销
+在临时测试数据库中造一批按钮权限、角色和用户，预热缓存后直接调用 PermissionMiddleware.process_view，
+统计不同情形下每次校验的耗时，以及热路径上的数据库查询次数（应为 0）。
+用法：python manage.py bench_authorization --menus 2000 --iterations 100000
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from DjangoPermit.benchmark import throwaway_database, timeit
+from menu.models import SysMenu, SysRoleMenu
+from menu.permission import embed_permission_claims
+from role.models import SysRole, SysUserRole
+from user.middleware import PermissionMiddleware
+from user.models import SysUser
+
+
+class Command(BaseCommand):
+    help = '测量接口权限校验中间件的单次请求开销'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menus', type=int, default=2000, help='按钮权限数量')
+        parser.add_argument('--iterations', type=int, default=100000, help='每种情形的调用次数')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.run(options['menus'], options['iterations'])
+
+    def run(self, menu_count, iterations):
+        admin_role = SysRole.objects.create(name='超级管理员', code='admin')
+        common_role = SysRole.objects.create(name='普通角色', code='common')
+        menus = SysMenu.objects.bulk_create([
+            SysMenu(name='按钮%s' % i, parent_id=0, order_num=i, menu_type='F', perms='bench:%s' % i)
+            for i in range(menu_count)
+        ] + [SysMenu(name='删除用户', parent_id=0, order_num=0, menu_type='F', perms='user:delete')])
+        SysRoleMenu.objects.bulk_create([SysRoleMenu(role=common_role, menu=menu) for menu in menus])
+        admin = SysUser.objects.create(username='bench_admin', password='x')
+        common = SysUser.objects.create(username='bench_common', password='x')
+        SysUserRole.objects.create(user=admin, role=admin_role)
+        SysUserRole.objects.create(user=common, role=common_role)
+
+        middleware = PermissionMiddleware(lambda request: None)
+        factory = RequestFactory()
+
+        def make_request(path, user_id):
+            request = factory.post(path)
+            request.resolver_match = resolve(path)
+            request.user_id = user_id
+            # 与登录签发的 access token 相同的授权 claims
+            request.jwt_claims = {}
+            embed_permission_claims(request.jwt_claims, user_id)
+            return request
+
+        cases = [
+            ('登录即可访问的路由', make_request('/user/updateAvatar', common.id)),
+            ('按权限标识放行', make_request('/user/delete', common.id)),
+            ('超级管理员放行', make_request('/user/delete', admin.id)),
+        ]
+        self.stdout.write('%-20s %12s %10s' % ('情形', 'us/次', '查询数'))
+        for label, request in cases:
+            check = lambda: middleware.process_view(request, None, (), {})
+            assert check() is None  # 预热缓存
+            with CaptureQueriesContext(connection) as queries:
+                elapsed, _ = timeit(check, repeat=3, number=iterations)
+            self.stdout.write('%-20s %12.2f %10d' % (label, elapsed * 1e6, len(queries.captured_queries)))
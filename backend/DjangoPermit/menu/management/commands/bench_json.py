@@ -0,0 +1,115 @@
+"""
+JSON 编码与响应压缩对比
+在临时测试数据库中造菜单树、用户和角色，统计：
+  1. 菜单树、登录 menuList、用户列表一页的编码耗时：标准库 + DjangoJSONEncoder（原 JsonResponse） vs DjangoPermit.http.dumps
+  2. 经过完整中间件链后 menu/search、user/search 的传输字节数：不压缩 / gzip / br
+用法：python manage.py bench_json --menus 1000 --users 100
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from DjangoPermit import compression, http
+from DjangoPermit.benchmark import throwaway_database, timeit
+from DjangoPermit.loaders import attach_related
+from menu.models import SysMenu, SysRoleMenu
+from menu.permission import get_user_permissions
+from menu.snapshot import build_menu_snapshot
+from role.loaders import load_user_roles
+from role.models import SysRole, SysUserRole
+from user.models import SysUser
+from user.views import USER_LIST_FIELDS
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+class Command(BaseCommand):
+    help = '对比 JSON 编码耗时和压缩前后的响应大小'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menus', type=int, default=1000, help='菜单数量')
+        parser.add_argument('--users', type=int, default=100, help='用户列表一页的用户数')
+        parser.add_argument('--number', type=int, default=200, help='每轮编码次数')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with throwaway_database():
+                self.run(options['menus'], options['users'], options['number'])
+        finally:
+            teardown_test_environment()
+
+    def run(self, menu_count, user_count, number):
+        admin = self.seed(menu_count, user_count)
+        users = list(SysUser.objects.order_by('id').values(*USER_LIST_FIELDS)[:user_count])
+        attach_related(users, 'roleList', load_user_roles)
+        snapshot = build_menu_snapshot(0)
+        payloads = [
+            ('菜单树', json.loads(snapshot.tree_content)),
+            ('登录 menuList', {'code': 200, 'menuList': get_user_permissions(admin.id)['menu_tree']}),
+            ('用户列表 %d 条' % user_count, {'code': 200, 'total': user_count, 'userList': users}),
+        ]
+        self.stdout.write('编码器：%s' % ('orjson' if http.orjson else '标准库（未安装 orjson）'))
+        self.stdout.write('%-16s %14s %14s %8s' % ('数据', '标准库 ms', '新编码 ms', '倍数'))
+        for label, data in payloads:
+            before, _ = timeit(lambda: stdlib_dumps(data), repeat=3, number=number)
+            after, _ = timeit(lambda: http.dumps(data), repeat=3, number=number)
+            self.stdout.write('%-16s %14.3f %14.3f %7.1fx' % (label, before * 1000, after * 1000, before / after))
+
+        client = Client()
+        token = str(RefreshToken.for_user(admin).access_token)
+        requests = [
+            ('menu/search', lambda **headers: client.get('/menu/search', **headers)),
+            ('user/search', lambda **headers: client.post(
+                '/user/search', {'pageNum': 1, 'pageSize': user_count}, content_type='application/json', **headers)),
+        ]
+        encodings = ['identity', 'gzip'] + (['br'] if compression.brotli else [])
+        self.stdout.write('\n%-16s' % '接口' + ''.join('%12s' % encoding for encoding in encodings) + '  （字节）')
+        for label, send in requests:
+            sizes = []
+            for encoding in encodings:
+                response = send(HTTP_AUTHORIZATION='Bearer ' + token, HTTP_ACCEPT_ENCODING=encoding)
+                assert response.get('Content-Encoding', 'identity') == encoding, response.get('Content-Encoding')
+                sizes.append(len(response.content))
+            self.stdout.write('%-16s' % label + ''.join('%12d' % size for size in sizes))
+        if not compression.brotli:
+            self.stdout.write('未安装 brotli，跳过 br')
+
+    def seed(self, menu_count, user_count):
+        role = SysRole.objects.create(name='普通角色', code='common')
+        other = SysRole.objects.create(name='审计角色', code='audit')
+        directories = max(1, menu_count // 20)
+        menus = SysMenu.objects.bulk_create([
+            SysMenu(name='目录%d' % i, icon='folder', parent_id=0, order_num=i, path='/dir%d' % i, menu_type='M',
+                    remark='系统目录%d' % i)
+            for i in range(directories)
+        ])
+        if menus[0].id is None:
+            # MySQL 的 bulk_create 不回填主键
+            menus = list(SysMenu.objects.order_by('id'))
+        menus += SysMenu.objects.bulk_create([
+            SysMenu(name='菜单%d' % i, icon='menu', parent_id=menus[i % directories].id, order_num=i,
+                    path='/menu/%d' % i, component='system/menu%d/index' % i, menu_type='C',
+                    perms='system:menu%d:list' % i, remark='系统菜单%d' % i)
+            for i in range(menu_count - directories)
+        ])
+        SysRoleMenu.objects.bulk_create([SysRoleMenu(role=role, menu=menu) for menu in SysMenu.objects.all()])
+        admin = SysUser.objects.create(username='bench_admin', password='x')
+        users = SysUser.objects.bulk_create([
+            SysUser(username='user%05d' % i, password='x', email='user%05d@example.com' % i,
+                    phonenumber='138%08d' % i, remark='批量创建的测试用户')
+            for i in range(user_count)
+        ])
+        if users and users[0].id is None:
+            users = list(SysUser.objects.exclude(id=admin.id).order_by('id'))
+        SysUserRole.objects.bulk_create(
+            [SysUserRole(user=admin, role=role)]
+            + [SysUserRole(user=user, role=r) for user in users for r in (role, other)]
+        )
+        return admin
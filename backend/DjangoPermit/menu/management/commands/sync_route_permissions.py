@@ -0,0 +1,47 @@
+"""
+为接口权限标识创建按钮菜单
+接口权限默认拒绝（见 menu/authorization.py）：sys_menu 中还没有的权限标识只有超级管理员角色可以访问。
+本命令按 URLconf 和 settings.ROUTE_PERMISSIONS 列出全部权限标识，为缺少的创建 menu_type='F' 的按钮菜单
+（名称即权限标识），之后在角色管理中把按钮分配给角色。已有的菜单不会修改。
+用法：python manage.py sync_route_permissions --parent 1
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from menu.authorization import route_permissions
+from menu.models import SysMenu
+from menu.permission import invalidate_all_permissions
+from menu.snapshot import invalidate_menu_snapshot
+
+
+class Command(BaseCommand):
+    help = '为接口权限标识创建缺少的按钮菜单'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parent', type=int, default=0, help='按钮菜单的父菜单ID，默认作为根节点')
+        parser.add_argument('--dry-run', action='store_true', help='只列出缺少的权限标识，不写入')
+
+    def handle(self, *args, **options):
+        perms = sorted({perm for perm in route_permissions().values() if perm})
+        existing = set(SysMenu.objects.filter(perms__in=perms).values_list('perms', flat=True))
+        missing = [perm for perm in perms if perm not in existing]
+        # 菜单名称唯一，名称已被其他菜单占用的跳过，需要手工配置
+        taken = set(SysMenu.objects.filter(name__in=missing).values_list('name', flat=True))
+        for perm in sorted(taken):
+            self.stderr.write('菜单名称已存在，跳过：%s' % perm)
+        missing = [perm for perm in missing if perm not in taken]
+        for perm in missing:
+            self.stdout.write(perm)
+        if options['dry_run'] or not missing:
+            self.stdout.write('缺少 %d 个权限标识' % len(missing))
+            return
+        today = datetime.now().date()
+        SysMenu.objects.bulk_create([
+            SysMenu(name=perm, parent_id=options['parent'], order_num=0, menu_type='F', perms=perm,
+                    create_time=today, update_time=today)
+            for perm in missing
+        ])
+        invalidate_all_permissions()
+        invalidate_menu_snapshot()
+        self.stdout.write(self.style.SUCCESS('已创建 %d 个按钮菜单' % len(missing)))
@@ -0,0 +1,211 @@
+"""
+用户有效权限解析
+用户 -> 角色组合 -> 通过 sys_role_menu / sys_menu 的一次联表查询得到角色组合的全部菜单，
+登录以及以后所有需要用户菜单的接口都应调用这里（get_user_permissions 等），而不是自己拼查询。
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from DjangoPermit.lru import LRUCache
+from DjangoPermit.versions import bump_version, bump_versions, get_versions
+from menu.models import SysMenu
+from menu.tree import serialize_menu_tree
+from role.models import SysUserRole
+
+
+def get_role_menus(role_ids):
+    """
+    查询一组角色合并后的菜单（去重）
+    按 order_num 排序，order_num 为空的排在最后，相同时按 id 排序
+    :param role_ids: 角色ID列表
+    :return: SysMenu 列表
+    """
+    if not role_ids:
+        return []
+    queryset = SysMenu.objects.filter(
+        sysrolemenu__role_id__in=role_ids
+    ).distinct().order_by(F('order_num').asc(nulls_last=True), 'id')
+    return list(queryset)
+
+
+# ============================================
+# 权限缓存
+# ============================================
+# 大量用户共享少数几种角色组合，因此分两层缓存：
+#   - 用户 -> 角色ID组合（排序后的元组）
+#   - 角色ID组合 -> 合并后的菜单ID、权限标识和序列化好的菜单树，同一组合的所有用户共用一份
+# 每层都是进程内 LRU 在前、Django 缓存框架在后。
+# 缓存键带有版本号，权限相关数据变更时递增版本号即可精确失效：
+#   - 用户角色变更 / 删除角色：递增相关用户的版本
+#   - 角色菜单变更：递增该角色的版本，只有包含该角色的组合失效
+#   - 菜单新增/修改/删除：递增全局菜单版本
+MENU_VERSION = 'perm:menu'
+USER_VERSION = 'perm:user:%s'
+ROLE_VERSION = 'perm:role:%s'
+
+
+class TieredCache:
+    """
+    进程内 LRU + Django 缓存的两级缓存
+    进程内的条目在 PERMISSION_LOCAL_CACHE_TTL 秒后过期，重新从 Django 缓存读取
+    """
+
+    def __init__(self, maxsize):
+        self.local = LRUCache(maxsize=maxsize)
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get_or_compile(self, key, compile_func):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = cache.get(key)
+        if value is not None:
+            self.shared_hits += 1
+        else:
+            self.misses += 1
+            value = compile_func()
+            cache.set(key, value, settings.PERMISSION_CACHE_TIMEOUT)
+        self.local.set(key, value, time.time() + settings.PERMISSION_LOCAL_CACHE_TTL)
+        return value
+
+    def stats(self):
+        """
+        local_* 为进程内 LRU，shared_hits 为 Django 缓存命中，misses 为两级都未命中、需要查库的次数
+        """
+        stats = self.local.stats()
+        return {
+            'local_size': stats['size'],
+            'local_maxsize': stats['maxsize'],
+            'local_hits': stats['hits'],
+            'local_evictions': stats['evictions'],
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+        }
+
+
+_user_cache = TieredCache(maxsize=settings.PERMISSION_CACHE_SIZE)
+_combo_cache = TieredCache(maxsize=settings.ROLE_COMBO_CACHE_SIZE)
+
+
+def get_user_permission_version(user_id):
+    """
+    读取用户的权限版本号（用户角色变化时递增）
+    """
+    user_version = USER_VERSION % user_id
+    return get_versions([user_version])[user_version]
+
+
+def get_user_role_ids(user_id, version=None):
+    """
+    读取用户的角色ID组合（排序后的元组，作为角色组合缓存的键）
+    :param version: 已读取的用户权限版本号，为空时重新读取
+    """
+    if version is None:
+        version = get_user_permission_version(user_id)
+    key = 'perm:user-roles:%s:%s' % (user_id, version)
+    return _user_cache.get_or_compile(key, lambda: tuple(sorted(
+        SysUserRole.objects.filter(user_id=user_id).values_list('role_id', flat=True).distinct()
+    )))
+
+
+def compile_role_permissions(role_ids):
+    """
+    从数据库编译一组角色的权限集合
+    :return: {'menu_ids': 菜单ID集合, 'perms': 权限标识集合, 'menu_tree': 序列化后的菜单树}
+    """
+    menuList = get_role_menus(role_ids)
+    return {
+        'menu_ids': frozenset(menu.id for menu in menuList),
+        'perms': frozenset(menu.perms for menu in menuList if menu.perms),
+        'menu_tree': serialize_menu_tree(menuList),
+    }
+
+
+def get_role_permissions(role_ids):
+    """
+    读取一组角色的权限集合，相同角色组合的用户共享同一个缓存条目
+    :param role_ids: 排序后的角色ID元组
+    """
+    role_versions = [ROLE_VERSION % role_id for role_id in role_ids]
+    versions = get_versions([MENU_VERSION] + role_versions)
+    key = 'perm:combo:%s:%s' % (
+        versions[MENU_VERSION],
+        '-'.join('%s.%s' % (role_id, versions[name]) for role_id, name in zip(role_ids, role_versions))
+    )
+    return _combo_cache.get_or_compile(key, lambda: compile_role_permissions(role_ids))
+
+
+def get_user_permissions(user_id):
+    """
+    读取用户的权限集合
+    :return: {'role_ids': 角色ID元组, 'menu_ids': 菜单ID集合, 'perms': 权限标识集合, 'menu_tree': 序列化后的菜单树}
+    """
+    role_ids = get_user_role_ids(user_id)
+    return {'role_ids': role_ids, **get_role_permissions(role_ids)}
+
+
+# ============================================
+# access token 中的授权 claims
+# ============================================
+# 登录时把用户的角色ID和权限版本号写入 access token，中间件直接用 token 中的角色授权，
+# 不必再查用户 -> 角色；用户角色变更后版本号递增，旧 token 的版本号不一致，回退到一次缓存查询。
+# 版本号保存在共享缓存中（settings.CACHES），任一 worker 进程签发的 token 在其他进程上同样可以比较。
+ROLES_CLAIM = 'roles'
+PERMISSION_VERSION_CLAIM = 'pv'
+
+
+def embed_permission_claims(access_token, user_id):
+    """
+    把授权 claims 写入 access token，并返回用户的权限集合（供登录接口返回菜单树）
+    """
+    version = get_user_permission_version(user_id)
+    role_ids = get_user_role_ids(user_id, version)
+    access_token[ROLES_CLAIM] = list(role_ids)
+    access_token[PERMISSION_VERSION_CLAIM] = version
+    return {'role_ids': role_ids, **get_role_permissions(role_ids)}
+
+
+def get_token_permissions(user_id, claims):
+    """
+    根据 access token 的 claims 读取用户的权限集合
+    claims 中的权限版本号与当前一致时直接使用其中的角色ID，否则回退到 get_user_role_ids
+    """
+    version = get_user_permission_version(user_id)
+    role_ids = claims.get(ROLES_CLAIM)
+    if role_ids is None or claims.get(PERMISSION_VERSION_CLAIM) != version:
+        role_ids = get_user_role_ids(user_id, version)
+    else:
+        role_ids = tuple(role_ids)
+    return {'role_ids': role_ids, **get_role_permissions(role_ids)}
+
+
+def invalidate_user_permissions(user_ids):
+    """
+    用户的角色发生变化后调用
+    """
+    bump_versions([USER_VERSION % user_id for user_id in user_ids])
+
+
+def invalidate_role_permissions(role_id):
+    """
+    角色的菜单发生变化后调用，使包含该角色的角色组合失效
+    """
+    bump_version(ROLE_VERSION % role_id)
+
+
+def invalidate_all_permissions():
+    """
+    菜单新增/修改/删除后调用
+    """
+    bump_version(MENU_VERSION)
+
+
+def permission_cache_stats():
+    return {
+        'user': _user_cache.stats(),
+        'roleCombo': _combo_cache.stats(),
+    }
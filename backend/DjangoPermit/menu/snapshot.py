@@ -0,0 +1,84 @@
+"""
+菜单树快照
+菜单一天只变动几次，但 SearchView / SearchAllMenuView 每次 GET 都要查全表并重新序列化。
+这里把完整菜单树和菜单列表预先序列化成 JSON 字节并打上版本号，GET 请求直接返回内存中的字节，
+并用版本号生成 ETag，客户端带 If-None-Match 且未变化时返回 304。
+版本号保存在 Django 缓存中（见 DjangoPermit.versions），菜单 SaveView / DeleteView 写入后递增，
+各进程在下一次 GET 时发现版本变化才重建快照。
+版本号和 ETag 在各 worker 进程之间一致的前提是 CACHES 为共享缓存（见 settings 与 DjangoPermit.versions），
+这样负载均衡把请求分到不同进程时，If-None-Match 仍然能命中 304。
+菜单列表支持 fields 参数只返回部分字段，每种字段组合在快照上按需序列化一次。
+"""
+import hashlib
+import threading
+
+from DjangoPermit.http import dumps
+from DjangoPermit.versions import bump_version, get_version
+from menu.models import SysMenu
+from menu.tree import MENU_FIELDS, serialize_menu_tree
+
+SNAPSHOT_VERSION = 'menu:snapshot'
+# 每个快照最多缓存的字段组合数，超出后按请求现场序列化
+MAX_LIST_VARIANTS = 64
+
+
+class MenuSnapshot:
+
+    def __init__(self, version, tree_content, list_content, menus=()):
+        self.version = version
+        self.tree_content = tree_content  # SearchView 的响应体
+        self.list_content = list_content  # SearchAllMenuView 的响应体
+        self.tree_etag = '"menu-tree-%s"' % version
+        self.list_etag = '"menu-list-%s"' % version
+        self.menus = menus  # 按 id 排序的菜单字典列表，用于生成部分字段的列表
+        self._list_variants = {}
+
+    def list_variant(self, fields):
+        """
+        只包含 fields 的菜单列表响应体和 ETag
+        :param fields: 字段元组（按 MENU_FIELDS 顺序）
+        """
+        if fields == MENU_FIELDS:
+            return self.list_content, self.list_etag
+        variant = self._list_variants.get(fields)
+        if variant is None:
+            content = dumps({'code': 200, 'allMenus': [{field: menu[field] for field in fields} for menu in self.menus]})
+            digest = hashlib.md5(','.join(fields).encode('utf-8')).hexdigest()[:8]
+            variant = (content, '"menu-list-%s-%s"' % (self.version, digest))
+            if len(self._list_variants) < MAX_LIST_VARIANTS:
+                self._list_variants[fields] = variant
+        return variant
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def build_menu_snapshot(version):
+    menu_list = list(SysMenu.objects.all().order_by('order_num', 'id').values(*MENU_FIELDS))
+    tree_content = dumps({'code': 200, 'menuList': serialize_menu_tree(menu_list)})
+    menus = sorted(menu_list, key=lambda menu: menu['id'])
+    list_content = dumps({'code': 200, 'allMenus': menus})
+    return MenuSnapshot(version, tree_content, list_content, menus)
+
+
+def get_menu_snapshot():
+    """
+    获取当前版本的菜单快照，版本变化时才重建
+    """
+    global _snapshot
+    version = get_version(SNAPSHOT_VERSION)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = build_menu_snapshot(version)
+        return _snapshot
+
+
+def invalidate_menu_snapshot():
+    """
+    菜单新增/修改/删除后调用
+    """
+    bump_version(SNAPSHOT_VERSION)
@@ -1,3 +1,403 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from DjangoPermit import compression, http
+from DjangoPermit.compression import CompressionMiddleware, parse_accept_encoding
+from DjangoPermit.metrics import registry
+from DjangoPermit.testing import QueryCountTestCase, create_admin
+from DjangoPermit.versions import check_shared_cache
+from menu import permission
+from menu.permission import (TieredCache, embed_permission_claims, get_token_permissions,
+                             get_user_permission_version, invalidate_user_permissions)
+from menu.tree import build_menu_tree, serialize_menu_tree
+from menu import snapshot
+from menu.authorization import route_permissions
+from menu.models import SysMenu, SysRoleMenu
+from role.models import SysRole, SysUserRole
+from user.models import SysUser
+
+
+class SearchAllMenuViewTest(TestCase):
+    """菜单列表：fields 参数只返回指定字段，每种字段组合有自己的 ETag"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = create_admin()
+        SysMenu.objects.bulk_create([
+            SysMenu(name='菜单%d' % i, parent_id=0, order_num=i, menu_type='M', remark='备注') for i in range(5)
+        ])
+        cls.token = str(RefreshToken.for_user(admin).access_token)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/menu/searchAllMenu/', params, HTTP_AUTHORIZATION='Bearer ' + self.token, **headers)
+
+    def test_fields(self):
+        full = self.get()
+        partial = self.get(fields='name,parent_id')
+        menus = partial.json()['allMenus']
+        self.assertEqual(len(menus), 5)
+        self.assertEqual(list(menus[0]), ['id', 'name', 'parent_id'])
+        self.assertNotEqual(full['ETag'], partial['ETag'])
+        # 同一字段组合复用快照中的响应体，ETag 不变时返回 304
+        response = self.get(partial['ETag'], fields='parent_id,name')
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_field(self):
+        self.assertEqual(self.get(fields='name,secret').json()['code'], 400)
+
+
+class MenuTreeTest(SimpleTestCase):
+    """菜单树：任意深度，子节点可以排在父节点之前，父节点不存在的菜单（及其子孙）丢弃"""
+
+    # (id, parent_id, name)，刻意把深层节点排在父节点之前
+    MENUS = [
+        (4, 3, '第四级'),
+        (1, 0, '系统管理'),
+        (3, 2, '第三级'),
+        (2, 1, '用户管理'),
+        (5, 1, '角色管理'),
+        (7, 6, '孤儿的子节点'),
+        (6, 99, '孤儿'),
+        (8, None, '业务管理'),
+    ]
+
+    def menus(self):
+        return [SysMenu(id=menu_id, parent_id=parent_id, name=name) for menu_id, parent_id, name in self.MENUS]
+
+    def shape(self, nodes):
+        return [(node['name'], self.shape(node['children'])) for node in nodes]
+
+    def test_serialize_models(self):
+        self.assertEqual(self.shape(serialize_menu_tree(self.menus())), [
+            ('系统管理', [('用户管理', [('第三级', [('第四级', [])])]), ('角色管理', [])]),
+            ('业务管理', []),
+        ])
+
+    def test_serialize_dicts(self):
+        menus = [{'id': menu_id, 'parent_id': parent_id, 'name': name} for menu_id, parent_id, name in self.MENUS]
+        tree = serialize_menu_tree(menus)
+        self.assertEqual(tree[0]['children'][0]['children'][0]['children'][0]['name'], '第四级')
+        self.assertEqual(len(tree), 2)
+
+    def test_build_models(self):
+        def shape(nodes):
+            return [(node.name, shape(getattr(node, 'children', []))) for node in nodes]
+
+        self.assertEqual(shape(build_menu_tree(self.menus())), [
+            ('系统管理', [('用户管理', [('第三级', [('第四级', [])])]), ('角色管理', [])]),
+            ('业务管理', []),
+        ])
+
+
+class MenuSnapshotTest(TestCase):
+    """菜单快照：共享缓存中的版本号递增后，各进程重建快照并更换 ETag；版本号不变时各进程的 ETag 相同"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = create_admin()
+        cls.menu = SysMenu.objects.create(name='系统管理', parent_id=0, order_num=1, menu_type='M')
+        cls.token = str(RefreshToken.for_user(admin).access_token)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/menu/search', HTTP_AUTHORIZATION='Bearer ' + self.token, **headers)
+
+    def test_same_version_same_etag(self):
+        first = self.get()
+        # 模拟另一个 worker 进程：进程内没有快照，版本号从共享缓存读取
+        with mock.patch.object(snapshot, '_snapshot', None):
+            response = self.get(first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_version_bump_rebuilds(self):
+        first = self.get()
+        self.assertEqual(self.get(first['ETag']).status_code, 304)
+        old = snapshot.get_menu_snapshot()
+        # 另一个进程修改了菜单并递增了共享缓存中的版本号
+        SysMenu.objects.filter(id=self.menu.id).update(name='系统设置')
+        snapshot.invalidate_menu_snapshot()
+        self.assertIsNot(snapshot.get_menu_snapshot(), old)
+        response = self.get(first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()['menuList'][0]['name'], '系统设置')
+
+
+class MetricsTest(TestCase):
+    """耗时统计：按路由记录查询次数，/metrics 输出 Prometheus 文本格式，Server-Timing 响应头"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = create_admin()
+        cls.token = str(RefreshToken.for_user(admin).access_token)
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    @override_settings(SERVER_TIMING=True)
+    def test_metrics(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/role/getRoleMenus', {'roleId': 1}, HTTP_AUTHORIZATION='Bearer ' + self.token)
+        count = len(queries)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="%d queries"' % count, response['Server-Timing'])
+
+        text = self.client.get('/metrics').content.decode()
+        labels = 'route="role/getRoleMenus",pid="%d"' % os.getpid()
+        self.assertIn('djangopermit_request_duration_seconds_count{%s} 1' % labels, text)
+        self.assertIn('djangopermit_db_queries_bucket{%s,le="0"} 0' % labels, text)
+        self.assertIn('djangopermit_db_queries_bucket{%s,le="+Inf"} 1' % labels, text)
+        self.assertIn('djangopermit_db_queries_sum{%s} %d' % (labels, count), text)
+
+    @override_settings(SERVER_TIMING=False, METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_access(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_proxied_requests_refused(self):
+        """经 Nginx 转发的请求来源同样是 127.0.0.1，带代理请求头的一律拒绝"""
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        for header in ('HTTP_X_FORWARDED_FOR', 'HTTP_X_REAL_IP', 'HTTP_FORWARDED'):
+            response = self.client.get('/metrics', REMOTE_ADDR='127.0.0.1', **{header: '203.0.113.7'})
+            self.assertEqual(response.status_code, 403, header)
+
+
+class CompressionMiddlewareTest(TestCase):
+    """响应压缩：小响应不压缩，按 Accept-Encoding 和 q 值协商，流式导出只用 gzip，压缩后 ETag 改为弱 ETag"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = create_admin()
+        SysMenu.objects.bulk_create([
+            SysMenu(name='菜单%03d' % i, parent_id=0, order_num=i, path='/menu%d' % i, menu_type='C')
+            for i in range(50)
+        ])
+        cls.token = str(RefreshToken.for_user(admin).access_token)
+
+    def setUp(self):
+        cache.clear()
+
+    def process(self, response, accept_encoding):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding('gzip, br;q=0.8, *;q=0, identity;q=x'),
+                         {'gzip': 1.0, 'br': 0.8, '*': 0.0, 'identity': 0.0})
+
+    @override_settings(COMPRESSION_MIN_SIZE=500)
+    def test_min_size(self):
+        small = self.process(HttpResponse(b'a' * 499), 'gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+        large = self.process(HttpResponse(b'a' * 500), 'gzip')
+        self.assertEqual(large['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(large.content), b'a' * 500)
+
+    def test_negotiation(self):
+        body = b'a' * 4096
+        self.assertFalse(self.process(HttpResponse(body), '').has_header('Content-Encoding'))
+        self.assertEqual(self.process(HttpResponse(body), 'deflate, gzip;q=0.5')['Content-Encoding'], 'gzip')
+        # q=0 表示不接受
+        refused = self.process(HttpResponse(body), 'gzip;q=0')
+        self.assertFalse(refused.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', refused['Vary'])
+        expected = 'br' if compression.brotli is not None else 'gzip'
+        self.assertEqual(self.process(HttpResponse(body), 'gzip;q=0.5, br')['Content-Encoding'], expected)
+        # gzip 的 q 值更高时优先 gzip
+        self.assertEqual(self.process(HttpResponse(body), 'gzip, br;q=0.5')['Content-Encoding'], 'gzip')
+
+    @skipIf(compression.brotli is None, 'brotli 未安装')
+    def test_brotli_weak_etag(self):
+        response = HttpResponse(b'a' * 4096)
+        response['ETag'] = '"v1"'
+        response = self.process(response, 'br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertEqual(compression.brotli.decompress(response.content), b'a' * 4096)
+
+    def test_streaming_export_uses_gzip(self):
+        response = self.client.get('/menu/export', {'format': 'ndjson'}, HTTP_AUTHORIZATION='Bearer ' + self.token,
+                                   HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 50)
+
+    def test_snapshot_weak_etag_304(self):
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + self.token, 'HTTP_ACCEPT_ENCODING': 'gzip'}
+        response = self.client.get('/menu/search', **headers)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        response = self.client.get('/menu/search', HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+        self.assertEqual(response.status_code, 304)
+
+
+class JsonResponseTest(SimpleTestCase):
+    """JSON 响应：没有 orjson 时用标准库编码日期时间，中文不转义"""
+
+    def test_stdlib_fallback(self):
+        data = {'date': date(2024, 1, 2), 'time': datetime(2024, 1, 2, 3, 4, 5), 'name': '超级管理员', 'amount': Decimal('1.50')}
+        with mock.patch.object(http, 'orjson', None):
+            content = http.dumps(data)
+            response = http.JsonResponse(data)
+        self.assertEqual(content.decode('utf-8'),
+                         '{"date":"2024-01-02","time":"2024-01-02T03:04:05","name":"超级管理员","amount":"1.50"}')
+        self.assertNotIn(b'\\u', content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content)['name'], '超级管理员')
+
+    def test_safe(self):
+        with self.assertRaises(TypeError):
+            http.JsonResponse([1, 2])
+        self.assertEqual(json.loads(http.JsonResponse([1, 2], safe=False).content), [1, 2])
+
+
+class PermissionCacheTest(TestCase):
+    """权限缓存：进程内条目有过期时间；进程内缓存时 check --deploy 给出警告"""
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PERMISSION_LOCAL_CACHE_TTL=30)
+    def test_local_entries_expire(self):
+        tiered = TieredCache(maxsize=8)
+        compiled = []
+        compile_func = lambda: compiled.append(1) or len(compiled)
+        self.assertEqual(tiered.get_or_compile('perm:test', compile_func), 1)
+        # 共享缓存中的条目已经失效（例如被其他进程替换），进程内的条目在有效期内仍然使用
+        cache.delete('perm:test')
+        self.assertEqual(tiered.get_or_compile('perm:test', compile_func), 1)
+        with mock.patch('DjangoPermit.lru.time.time', return_value=time.time() + 31):
+            self.assertEqual(tiered.get_or_compile('perm:test', compile_func), 2)
+
+    def test_check_shared_cache(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['DjangoPermit.W001'])
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/0',
+        }}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class SyncRoutePermissionsTest(TestCase):
+    """sync_route_permissions 为每个路由所需的权限标识创建按钮菜单，已有的不重复创建"""
+
+    def test_sync(self):
+        SysMenu.objects.create(name='删除用户', parent_id=0, order_num=0, menu_type='F', perms='user:delete')
+        call_command('sync_route_permissions', stdout=StringIO())
+        perms = {perm for perm in route_permissions().values() if perm}
+        self.assertIn('user:search', perms)
+        self.assertNotIn('user:export', perms)  # 导出沿用 user:search
+        self.assertNotIn('user:updateAvatar', perms)  # 登录即可访问
+        self.assertEqual(set(SysMenu.objects.values_list('perms', flat=True)), perms)
+        self.assertEqual(SysMenu.objects.filter(perms='user:delete').count(), 1)
+
+
+class TokenClaimsTest(TestCase):
+    """access token 中的授权 claims：权限版本号一致时直接使用其中的角色，不一致或缺失时回退到查询"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = SysRole.objects.create(name='普通角色', code='common')
+        cls.other_role = SysRole.objects.create(name='审计角色', code='audit')
+        button = SysMenu.objects.create(name='搜索用户', parent_id=0, order_num=0, menu_type='F', perms='user:search')
+        SysRoleMenu.objects.create(role=cls.role, menu=button)
+        cls.user = SysUser.objects.create(username='operator', password='x')
+        SysUserRole.objects.create(user=cls.user, role=cls.role)
+
+    def setUp(self):
+        cache.clear()
+
+    def issue(self):
+        claims = {}
+        permissions = embed_permission_claims(claims, self.user.id)
+        return claims, permissions
+
+    def switch_role(self):
+        SysUserRole.objects.filter(user=self.user).update(role=self.other_role)
+
+    def test_embed(self):
+        claims, permissions = self.issue()
+        self.assertEqual(claims['roles'], [self.role.id])
+        self.assertEqual(claims['pv'], get_user_permission_version(self.user.id))
+        self.assertIn('user:search', permissions['perms'])
+
+    def test_matching_version_uses_claims(self):
+        claims, _ = self.issue()
+        # 另一个 worker 进程：进程内缓存为空，版本号和角色组合的权限从共享缓存读取，不查库
+        with mock.patch.object(permission, '_user_cache', TieredCache(8)), \
+                mock.patch.object(permission, '_combo_cache', TieredCache(8)):
+            with self.assertNumQueries(0):
+                permissions = get_token_permissions(self.user.id, claims)
+        self.assertEqual(permissions['role_ids'], (self.role.id,))
+
+    def test_version_mismatch_falls_back(self):
+        claims, _ = self.issue()
+        self.switch_role()
+        invalidate_user_permissions([self.user.id])
+        permissions = get_token_permissions(self.user.id, claims)
+        self.assertEqual(permissions['role_ids'], (self.other_role.id,))
+        self.assertNotIn('user:search', permissions['perms'])
+
+    def test_missing_claims_fall_back(self):
+        self.assertEqual(get_token_permissions(self.user.id, {})['role_ids'], (self.role.id,))
+        self.assertEqual(get_token_permissions(self.user.id, {'pv': 1})['role_ids'], (self.role.id,))
+
+
+class QueryCountTest(QueryCountTestCase):
+    """menu 模块每个接口的查询次数，不随菜单数增长"""
+
+    def test_search_all_menu(self):
+        self.assertQueryCounts(1, lambda size: self.request('get', '/menu/searchAllMenu/'))
+
+    def test_search(self):
+        self.assertQueryCounts(1, lambda size: self.request('get', '/menu/search'))
+
+    def test_save_new(self):
+        self.assertQueryCounts(2, lambda size: self.request(
+            'post', '/menu/save', {'id': -1, 'name': '新菜单%d' % size, 'menu_type': 'C'}))
+
+    def test_save_edit(self):
+        self.assertQueryCounts(3, lambda size: self.request(
+            'post', '/menu/save', {'id': self.menus[0].id, 'name': '改名%d' % size, 'menu_type': 'C'}))
+
+    def test_delete(self):
+        def call(size):
+            menu = SysMenu.objects.create(name='待删除%d' % size, parent_id=0, order_num=0, menu_type='C')
+            return self.request('post', '/menu/delete', {'id': menu.id})
+
+        self.assertQueryCounts(6, call)
+
+    def test_search_cold(self):
+        # 冷缓存下的第一个请求：接口权限索引、用户角色、权限集合、菜单快照各加载一次
+        self.assertQueryCounts(4, lambda size: self.request('get', '/menu/search'), cold=True)
+
+    def test_cache_stats(self):
+        self.assertQueryCounts(0, lambda size: self.request('get', '/menu/cacheStats'))
+
+    def test_export(self):
+        # 流式导出按块读取，每块一次查询
+        self.assertQueryCounts({10: 1, 1000: 2}, lambda size: self.request('get', '/menu/export', {'format': 'ndjson'}))
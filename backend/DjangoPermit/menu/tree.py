@@ -0,0 +1,69 @@
+"""
+菜单树构造工具
+"""
+
+
+def build_menu_tree(menuList):
+    """
+    根据 parent_id 构造菜单树（线性时间）
+    先建立 id -> 菜单 的索引，再一次遍历把每个菜单挂到父节点的 children 下，
+    parent_id 为空或 0 的菜单作为根节点；父节点不在列表中的菜单会被丢弃。
+    子节点保持 menuList 中的原有顺序，因此传入前应先排好序。
+    :param menuList: 已排序的 SysMenu 列表
+    :return: 根节点列表
+    """
+    menu_map = {menu.id: menu for menu in menuList}
+    resultMenuList = []
+    for menu in menuList:
+        parent_id = menu.parent_id
+        if not parent_id:
+            resultMenuList.append(menu)
+            continue
+        parent = menu_map.get(parent_id)
+        if parent is None:
+            continue
+        # 判断父节点下面是否存在children属性
+        if not hasattr(parent, "children"):
+            parent.children = list()
+        parent.children.append(menu)
+    return resultMenuList
+
+
+# 菜单序列化输出的字段（顺序固定），children 始终放在最后
+MENU_FIELDS = (
+    'id', 'name', 'icon', 'parent_id', 'order_num',
+    'path', 'component', 'menu_type', 'perms',
+    'create_time', 'update_time', 'remark'
+)
+
+
+def serialize_menu_tree(menu_list, fields=MENU_FIELDS):
+    """
+    把扁平的菜单列表直接转换成任意深度的嵌套字典树
+    不经过 DRF 序列化器：每个节点只做一次字段拷贝，再按 parent_id 索引挂到父节点下。
+    每个节点都会带上 children 列表；父节点不在列表中的菜单会被丢弃。
+    :param menu_list: 已排序的 SysMenu 列表，或 .values() 得到的字典列表
+    :param fields: SysMenu 需要输出的字段（字典按原有的键输出）
+    :return: 根节点列表
+    """
+    # 先把所有菜单转换成字典并建立映射
+    nodes = []
+    menu_map = {}
+    for menu in menu_list:
+        if isinstance(menu, dict):
+            node = {**menu, 'children': []}
+        else:
+            node = {field: getattr(menu, field) for field in fields}
+            node['children'] = []
+        nodes.append(node)
+        menu_map[node['id']] = node
+    
+    # 构建树结构
+    root_menus = []
+    for node in nodes:
+        parent_id = node.get('parent_id')
+        if not parent_id:
+            root_menus.append(node)
+        elif parent_id in menu_map:
+            menu_map[parent_id]['children'].append(node)
+    return root_menus
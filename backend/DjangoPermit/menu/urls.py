@@ -1,10 +1,12 @@
 from django.urls import path
 
-from menu.views import SearchAllMenuView, SearchView, SaveView, DeleteView
+from menu.views import SearchAllMenuView, SearchView, SaveView, DeleteView, CacheStatsView, ExportView
 
 urlpatterns = [
     path('searchAllMenu/', SearchAllMenuView.as_view(), name='searchAllMenu'),  # 查询所有菜单
     path('search', SearchView.as_view(), name='search'),  # 搜索菜单（树形结构）
     path('save', SaveView.as_view(), name='save'),  # 保存菜单（新增/编辑）
     path('delete', DeleteView.as_view(), name='delete'),  # 删除菜单
+    path('cacheStats', CacheStatsView.as_view(), name='cacheStats'),  # 缓存统计
+    path('export', ExportView.as_view(), name='export'),  # 导出菜单（CSV/NDJSON）
 ]
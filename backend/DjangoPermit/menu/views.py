@@ -1,12 +1,51 @@
 from django.shortcuts import render
 from django.views import View
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified
+from DjangoPermit.http import JsonResponse
+from django.utils.http import parse_etags
 from menu.models import SysMenu, SysRoleMenu
+from menu.permission import invalidate_all_permissions, permission_cache_stats
+from menu.snapshot import get_menu_snapshot, invalidate_menu_snapshot
+from menu.tree import MENU_FIELDS
+from DjangoPermit.export import ExportError, export_response, iter_chunks
+from DjangoPermit.fieldsets import FieldsError, parse_fields
+from DjangoPermit.db_backends.mysql_pool.pool import pool_stats
+from user.middleware import token_cache_stats
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 import json
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+
+def invalidate_menu_caches():
+    """
+    菜单新增/修改/删除后，使依赖菜单数据的缓存失效：用户权限、菜单快照
+    """
+    invalidate_all_permissions()
+    invalidate_menu_snapshot()
+
+
+def snapshot_response(request, content, etag):
+    """
+    返回快照中预先序列化好的 JSON；If-None-Match 与当前 ETag 一致时返回 304
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # 压缩中间件会把 ETag 改成弱 ETag（W/"..."），按弱比较匹配
+        etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)]
+        if '*' in etags or etag in etags:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+    response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    # 要求客户端每次都带 If-None-Match 重新验证
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class SearchAllMenuView(View):
@@ -14,20 +53,18 @@ class SearchAllMenuView(View):
     
     def get(self, request):
         try:
-            print("开始获取菜单列表...")
-            all_menus = SysMenu.objects.all().values(
-                'id', 'name', 'icon', 'parent_id', 'order_num', 
-                'path', 'component', 'menu_type', 'perms', 
-                'create_time', 'update_time', 'remark'
-            )
-            all_menu_list = list(all_menus)
-            print(f"获取到 {len(all_menu_list)} 个菜单")
-            return JsonResponse({'code': 200, 'allMenus': all_menu_list})
+            # fields 参数（逗号分隔）只返回指定的字段
+            try:
+                fields = parse_fields(request.GET.get('fields'), MENU_FIELDS)
+            except FieldsError as e:
+                return JsonResponse({'code': 400, 'errorInfo': str(e)})
+            snapshot = get_menu_snapshot()
+            content, etag = snapshot.list_variant(fields)
+            return snapshot_response(request, content, etag)
         except Exception as e:
             import traceback
             error_trace = traceback.format_exc()
-            print(f"获取菜单列表错误: {e}")
-            print(f"完整错误堆栈:\n{error_trace}")
+            logger.exception("获取菜单列表错误: %s", e)
             return JsonResponse({
                 'code': 500, 
                 'errorInfo': f'获取菜单列表失败：{str(e)}',
@@ -41,39 +78,10 @@ class SearchView(View):
     
     def get(self, request):
         try:
-            # 获取所有菜单
-            all_menus = SysMenu.objects.all().order_by('order_num', 'id').values(
-                'id', 'name', 'icon', 'parent_id', 'order_num', 
-                'path', 'component', 'menu_type', 'perms', 
-                'create_time', 'update_time', 'remark'
-            )
-            menu_list = list(all_menus)
-            
-            # 构建树形结构
-            menu_map = {}
-            root_menus = []
-            
-            # 先创建所有菜单的映射
-            for menu in menu_list:
-                menu_map[menu['id']] = {
-                    **menu,
-                    'children': []
-                }
-            
-            # 构建树结构
-            for menu in menu_list:
-                menu_node = menu_map[menu['id']]
-                parent_id = menu['parent_id']
-                if not parent_id or parent_id == 0:
-                    root_menus.append(menu_node)
-                elif parent_id in menu_map:
-                    menu_map[parent_id]['children'].append(menu_node)
-            
-            return JsonResponse({'code': 200, 'menuList': root_menus})
+            snapshot = get_menu_snapshot()
+            return snapshot_response(request, snapshot.tree_content, snapshot.tree_etag)
         except Exception as e:
-            import traceback
-            print(f"搜索菜单错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("搜索菜单错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'搜索失败：{str(e)}'})
 
 
@@ -118,6 +126,7 @@ class SaveView(View):
                     update_time=datetime.now().date()
                 )
                 obj_menu.save()
+                invalidate_menu_caches()
                 return JsonResponse({'code': 200, 'info': '添加成功！'})
             else:
                 # 编辑菜单
@@ -145,11 +154,10 @@ class SaveView(View):
                 obj_menu.remark = remark if remark else None
                 obj_menu.update_time = datetime.now().date()
                 obj_menu.save()
+                invalidate_menu_caches()
                 return JsonResponse({'code': 200, 'info': '修改成功！'})
         except Exception as e:
-            import traceback
-            print(f"保存菜单错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("保存菜单错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'操作失败：{str(e)}'})
 
 
@@ -180,9 +188,33 @@ class DeleteView(View):
             
             # 删除菜单
             obj_menu.delete()
+            invalidate_menu_caches()
             return JsonResponse({'code': 200, 'info': '删除成功！'})
         except Exception as e:
-            import traceback
-            print(f"删除菜单错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("删除菜单错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'删除失败：{str(e)}'})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CacheStatsView(View):
+    """权限缓存、token 缓存、数据库连接池统计（用于评估容量）"""
+    
+    def get(self, request):
+        return JsonResponse({
+            'code': 200,
+            'permissionCache': permission_cache_stats(),
+            'tokenCache': token_cache_stats(),
+            'dbPool': pool_stats(),
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExportView(View):
+    """流式导出全部菜单（format=csv/ndjson），按 id 排序的扁平列表，层级关系见 parent_id"""
+
+    def get(self, request):
+        chunks = iter_chunks(SysMenu.objects.values(*MENU_FIELDS))
+        try:
+            return export_response(request, chunks, MENU_FIELDS, 'menus')
+        except ExportError as e:
+            return JsonResponse({'code': 400, 'errorInfo': str(e)})
@@ -0,0 +1,21 @@
+"""
+角色相关的批量加载器（配合 DjangoPermit.loaders.attach_related 使用）
+"""
+from DjangoPermit.loaders import group_by
+from role.models import SysUserRole
+
+
+def load_user_roles(user_ids):
+    """
+    一次 IN 查询读取多个用户的角色（sys_user_role 关联 sys_role）
+    :param user_ids: 用户ID列表
+    :return: {用户ID: [{'id': 角色ID, 'name': 角色名称}, ...]}
+    """
+    rows = SysUserRole.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'role_id', 'role__name'
+    ).distinct().order_by('user_id', 'role_id')
+    grouped = group_by(rows, lambda row: row[0])
+    return {
+        user_id: [{'id': role_id, 'name': name} for _, role_id, name in items]
+        for user_id, items in grouped.items()
+    }
@@ -1,3 +1,381 @@
-from django.test import TestCase
+import json
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from pymysql.constants import SERVER_STATUS
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from DjangoPermit import routers
+from DjangoPermit.db_backends.mysql_pool import base as pool_base, pool as pool_module
+from DjangoPermit.db_backends.mysql_pool.pool import ConnectionPool, PoolTimeout
+from DjangoPermit.testing import QueryCountTestCase, create_admin
+from menu.models import SysMenu, SysRoleMenu
+from role.models import SysRole, SysUserRole
+
+
+class AssignPermissionViewTest(TestCase):
+    """分配权限：按差集更新，查询次数不随菜单数量增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = create_admin()
+        cls.role = SysRole.objects.create(name='角色', code='role')
+        cls.menus = SysMenu.objects.bulk_create([
+            SysMenu(name='菜单%d' % i, parent_id=0, order_num=i, menu_type='C') for i in range(300)
+        ])
+        cls.token = str(RefreshToken.for_user(admin).access_token)
+
+    def setUp(self):
+        cache.clear()
+
+    def assign(self, menu_ids):
+        return self.client.post(
+            '/role/assignPermission', json.dumps({'roleId': self.role.id, 'menuIds': menu_ids}),
+            content_type='application/json', HTTP_AUTHORIZATION='Bearer ' + self.token,
+        ).json()
+
+    def menu_ids(self):
+        return sorted(SysRoleMenu.objects.filter(role=self.role).values_list('menu_id', flat=True))
+
+    def test_diff(self):
+        ids = [menu.id for menu in self.menus]
+        self.assign(ids[:200])
+        response = self.assign(ids[100:300] + [-1, 'x'])
+        self.assertEqual(response['added'], ids[200:300])
+        self.assertEqual(response['removed'], ids[:100])
+        self.assertEqual(response['ignored'], ['x', -1])
+        self.assertEqual(self.menu_ids(), ids[100:300])
+
+        response = self.assign(ids[100:300])
+        self.assertEqual((response['added'], response['removed']), ([], []))
+
+    def test_query_count_constant(self):
+        ids = [menu.id for menu in self.menus]
+        self.assign(ids[:10])  # 预热接口权限索引
+        # 角色存在性、菜单校验、事务保存点、现有关联、删除、插入、释放保存点；权限缓存失效不查库
+        with self.assertNumQueries(7):
+            self.assign(ids[5:15])
+        with self.assertNumQueries(7):
+            self.assign(ids[10:300])
+
+
+@override_settings(REPLICA_DATABASES={'replica': 1})
+class ReplicaRoutingTest(TestCase):
+    """读写分离：只读接口读从库，写操作后的一段时间内读主库（两个 SQLite 库模拟主从）"""
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = create_admin()
+        SysRole.objects.create(name='主库角色', code='primary')
+        SysRole.objects.using('replica').create(name='从库角色', code='replica')
+        cls.token = str(RefreshToken.for_user(admin).access_token)
+
+    def setUp(self):
+        # 写后读主库的标记需要各进程共享的缓存，文件缓存模拟 Redis
+        cache_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir,
+        }}))
+        cache.clear()
+
+    def role_names(self):
+        response = self.client.get('/role/searchAllRole/', HTTP_AUTHORIZATION='Bearer ' + self.token).json()
+        return [role['name'] for role in response['allRoles']]
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.role_names(), ['从库角色'])
+
+    @override_settings(REPLICA_DATABASES={'replica': 0})
+    def test_no_replica_available(self):
+        self.assertEqual(self.role_names(), ['超级管理员', '主库角色'])
+
+    def test_sticky_after_write(self):
+        response = self.client.post(
+            '/role/save', json.dumps({'name': '新角色', 'code': 'new'}),
+            content_type='application/json', HTTP_AUTHORIZATION='Bearer ' + self.token,
+        ).json()
+        self.assertEqual(response['code'], 200)
+        # 自己刚写入的数据在从库同步之前也能读到
+        self.assertEqual(self.role_names(), ['超级管理员', '主库角色', '新角色'])
+        cache.clear()  # 模拟 REPLICA_STICKY_SECONDS 已过
+        self.assertEqual(self.role_names(), ['从库角色'])
+
+    def test_process_local_cache_uses_primary(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}), \
+                mock.patch.object(routers, '_replica_disabled_warned', False), \
+                self.assertLogs('DjangoPermit.routers', 'WARNING'):
+            self.assertEqual(self.role_names(), ['超级管理员', '主库角色'])
+
+
+class FakeConnection:
+    """连接池测试用的假连接：alive 为 False 时 ping 失败"""
+
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """连接池：复用、溢出、等待超时、过期回收、探活失败、归还时丢弃损坏的连接；网络 I/O 不持有锁"""
+
+    def make_pool(self, **options):
+        self.connections = []
+
+        def factory():
+            conn = FakeConnection(len(self.connections))
+            self.connections.append(conn)
+            return conn
+
+        def ping(conn):
+            if not conn.alive:
+                raise OSError('gone away')
+
+        def close(conn):
+            conn.closed = True
+
+        options.setdefault('ping_idle', 0)
+        self.pool = ConnectionPool(factory, ping, close, **options)
+        return self.pool
+
+    def test_reuse(self):
+        pool = self.make_pool(size=2)
+        conn, reused = pool.acquire()
+        self.assertFalse(reused)
+        pool.release(conn)
+        self.assertEqual(pool.acquire(), (conn, True))
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['checkouts'], stats['connections']), (1, 2, 1))
+
+    def test_overflow(self):
+        pool = self.make_pool(size=1, max_overflow=1, timeout=0.05)
+        first, _ = pool.acquire()
+        second, _ = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(first)
+        # 空闲连接已满，超出 size 的连接归还时关闭
+        pool.release(second)
+        self.assertTrue(second.closed)
+        self.assertFalse(first.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['connections'], stats['idle'], stats['closed'], stats['timeouts']), (1, 1, 1, 1))
+
+    def test_timeout_and_wait(self):
+        pool = self.make_pool(size=1, max_overflow=0, timeout=0.05)
+        conn, _ = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        # 其他线程归还后，等待中的线程拿到同一个连接
+        pool.timeout = 5
+        timer = threading.Timer(0.05, pool.release, [conn])
+        timer.start()
+        self.assertEqual(pool.acquire(), (conn, True))
+        timer.join()
+        stats = pool.stats()
+        # waits 只统计等待后成功借出的次数
+        self.assertEqual((stats['timeouts'], stats['waits']), (1, 1))
+        self.assertGreater(stats['max_wait_time'], 0)
+
+    def test_recycle(self):
+        pool = self.make_pool(size=2)
+        conn, _ = pool.acquire()
+        pool.release(conn)
+        pool.recycle = 0
+        new, reused = pool.acquire()
+        self.assertFalse(reused)
+        self.assertTrue(conn.closed)
+        # 借出期间过期的连接归还时关闭
+        pool.release(new)
+        self.assertTrue(new.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['recycled'], stats['closed'], stats['connections']), (2, 2, 0))
+
+    def test_ping_failure(self):
+        pool = self.make_pool(size=2)
+        conn, _ = pool.acquire()
+        pool.release(conn)
+        conn.alive = False
+        new, reused = pool.acquire()
+        self.assertIsNot(new, conn)
+        self.assertFalse(reused)
+        self.assertTrue(conn.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['ping_failures'], stats['connections']), (1, 1))
+
+    def test_ping_skipped_for_recent_connections(self):
+        pool = self.make_pool(size=2, ping_idle=60)
+        conn, _ = pool.acquire()
+        pool.release(conn)
+        conn.alive = False
+        self.assertEqual(pool.acquire(), (conn, True))
+
+    def test_release_discards_broken_connection(self):
+        pool = self.make_pool(size=2)
+        conn, _ = pool.acquire()
+        pool.release(conn, discard=True)
+        self.assertTrue(conn.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['connections'], stats['idle'], stats['closed'], stats['recycled']), (0, 0, 1, 0))
+        # 重复归还忽略
+        pool.release(conn)
+        self.assertEqual(pool.stats()['closed'], 1)
+
+    def test_io_outside_lock(self):
+        """探活和关闭期间其他线程可以拿到锁"""
+        pool = self.make_pool(size=2)
+        lock_free = []
+
+        def lock_is_free():
+            result = []
+
+            def try_lock():
+                if pool._cond.acquire(timeout=1):
+                    pool._cond.release()
+                    result.append(True)
+
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            lock_free.append(bool(result))
+
+        def ping(conn):
+            lock_is_free()
+            raise OSError('gone away')
+
+        conn, _ = pool.acquire()
+        pool.release(conn)
+        pool.ping = ping
+        pool.close_connection = lambda conn: lock_is_free()
+        pool.acquire()
+        self.assertEqual(lock_free, [True, True])
+
+
+class PooledDatabaseWrapperTest(SimpleTestCase):
+    """连接池 MySQL 后端：复用的连接不重复初始化会话，归还前回滚未结束的事务，损坏的连接丢弃"""
+
+    class Connection:
+        def __init__(self):
+            self.server_status = 0
+            self.autocommit = True
+            self.rolled_back = False
+            self.rollback_error = None
+            self.alive = True
+            self.closed = False
+
+        def get_autocommit(self):
+            return self.autocommit
+
+        def rollback(self):
+            if self.rollback_error:
+                raise self.rollback_error
+            self.rolled_back = True
+
+        def ping(self, reconnect=False):
+            if not self.alive:
+                raise pool_base.Database.OperationalError(2006, 'MySQL server has gone away')
+
+        def close(self):
+            self.closed = True
+
+    def setUp(self):
+        self.enterContext(mock.patch.dict(pool_module._pools, clear=True))
+        self.enterContext(mock.patch.object(pool_base.Database, 'connect', side_effect=lambda **kwargs: self.Connection()))
+        self.init_state = self.enterContext(
+            mock.patch('django.db.backends.mysql.base.DatabaseWrapper.init_connection_state'))
+        self.wrapper = pool_base.DatabaseWrapper({
+            'ENGINE': 'DjangoPermit.db_backends.mysql_pool', 'NAME': 'test', 'USER': 'root', 'PASSWORD': '',
+            'HOST': '127.0.0.1', 'PORT': '3306', 'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'TEST': {},
+            'POOL': {'SIZE': 2, 'PING_IDLE': 0},
+        }, alias='pooled')
+
+    def connect(self):
+        wrapper = self.wrapper
+        wrapper.connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        wrapper.errors_occurred = False
+        wrapper.init_connection_state()
+        return wrapper.connection
+
+    def close(self):
+        self.wrapper._close()
+        self.wrapper.connection = None
+
+    def test_reused_connection_skips_init(self):
+        conn = self.connect()
+        self.assertFalse(self.wrapper.connection_reused)
+        self.close()
+        self.assertIs(self.connect(), conn)
+        self.assertTrue(self.wrapper.connection_reused)
+        self.assertEqual(self.init_state.call_count, 1)
+        self.assertEqual(self.wrapper.pool.stats()['created'], 1)
+
+    def test_open_transaction_rolled_back(self):
+        conn = self.connect()
+        conn.autocommit = False
+        self.close()
+        self.assertTrue(conn.rolled_back)
+        self.assertEqual(self.wrapper.pool.stats()['idle'], 1)
+
+    def test_failed_rollback_discards(self):
+        conn = self.connect()
+        conn.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        conn.rollback_error = pool_base.Database.OperationalError(2013, 'Lost connection')
+        self.close()
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.wrapper.pool.stats()['connections'], 0)
+
+    def test_unusable_after_error_discards(self):
+        conn = self.connect()
+        self.wrapper.errors_occurred = True
+        conn.alive = False
+        self.close()
+        self.assertTrue(conn.closed)
+        self.assertIsNot(self.connect(), conn)
+
+
+class QueryCountTest(QueryCountTestCase):
+    """role 模块每个接口的查询次数，不随数据量（角色数、每页条数、菜单数）增长"""
+
+    def test_search_all_role(self):
+        self.assertQueryCounts(1, lambda size: self.request('get', '/role/searchAllRole/'))
+
+    def test_search(self):
+        self.assertQueryCounts(2, lambda size: self.request('post', '/role/search', {'pageNum': 1, 'pageSize': size}))
+
+    def test_search_cursor(self):
+        self.assertQueryCounts(3, lambda size: self.request('post', '/role/search', {'cursor': None, 'pageSize': size}))
+
+    def test_save_new(self):
+        self.assertQueryCounts(3, lambda size: self.request(
+            'post', '/role/save', {'id': -1, 'name': '新角色%d' % size, 'code': 'new%d' % size}))
+
+    def test_save_edit(self):
+        self.assertQueryCounts(4, lambda size: self.request(
+            'post', '/role/save', {'id': self.role.id, 'name': '普通角色%d' % size, 'code': 'common'}))
+
+    def test_delete(self):
+        # 被删除的角色分配给了全部用户和全部菜单
+        def call(size):
+            role = self.roles.pop()
+            SysUserRole.objects.bulk_create([SysUserRole(user=user, role=role) for user in self.users])
+            SysRoleMenu.objects.bulk_create([SysRoleMenu(role=role, menu=menu) for menu in self.menus])
+            return self.request('post', '/role/delete', {'id': role.id})
+
+        self.assertQueryCounts(9, call)
+
+    def test_get_role_menus(self):
+        self.assertQueryCounts(2, lambda size: self.request('get', '/role/getRoleMenus', {'roleId': self.role.id}))
+
+    def test_assign_permission(self):
+        self.assertQueryCounts(6, lambda size: self.request('post', '/role/assignPermission', {
+            'roleId': self.other_role.id, 'menuIds': [menu.id for menu in self.menus]}))
+
+    def test_export(self):
+        # 流式导出按块读取，每块一次查询
+        self.assertQueryCounts({10: 1, 1000: 2}, lambda size: self.request('get', '/role/export', {'format': 'ndjson'}))
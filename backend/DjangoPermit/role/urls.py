@@ -1,6 +1,6 @@
 from django.urls import path
 
-from role.views import SearchAllRoleView, SearchView, SaveView, DeleteView, GetRoleMenusView, AssignPermissionView
+from role.views import SearchAllRoleView, SearchView, SaveView, DeleteView, GetRoleMenusView, AssignPermissionView, ExportView
 
 urlpatterns = [
     path('searchAllRole/', SearchAllRoleView.as_view(), name='searchAllRole'),  # 查询所有的角色
@@ -9,4 +9,5 @@ urlpatterns = [
     path('delete', DeleteView.as_view(), name='delete'),  # 删除角色
     path('getRoleMenus', GetRoleMenusView.as_view(), name='getRoleMenus'),  # 获取角色的菜单列表
     path('assignPermission', AssignPermissionView.as_view(), name='assignPermission'),  # 分配权限
-]
\ No newline at end of file
+    path('export', ExportView.as_view(), name='export'),  # 导出角色（CSV/NDJSON）
+]
@@ -1,24 +1,49 @@
 from django.shortcuts import render
 from django.views import View
-from django.http import JsonResponse
+from DjangoPermit.http import JsonResponse
 from role.models import SysRole, SysRoleSerializer, SysUserRole
 from menu.models import SysMenu, SysRoleMenu
+from menu.authorization import invalidate_authorization_index
+from menu.permission import invalidate_role_permissions, invalidate_user_permissions
+from search.backends import index_objects, remove_objects, search_filter
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 import json
+import logging
 from django.core.paginator import Paginator
+from DjangoPermit.counts import bump_table_versions, cached_count
+from DjangoPermit.fieldsets import FieldsError, parse_fields
+from DjangoPermit.export import ExportError, export_response, iter_chunks
+from DjangoPermit.links import sync_links
+from DjangoPermit.pagination import CursorError, cursor_page
+from DjangoPermit.routers import read_from_replica
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(read_from_replica, name='dispatch')
 class SearchAllRoleView(View):
     def get(self, request):
-        allRoles = SysRole.objects.all().values('id', 'name', 'code', 'create_time', 'update_time', 'remark')
+        # fields 参数（逗号分隔）只查询、只返回指定的字段
+        try:
+            fields = parse_fields(request.GET.get('fields'), ROLE_LIST_FIELDS)
+        except FieldsError as e:
+            return JsonResponse({'code': 400, 'errorInfo': str(e)})
+        allRoles = SysRole.objects.all().values(*fields)
         allRoleList = list(allRoles)
         return JsonResponse({'code': 200, 'allRoles': allRoleList})
     
 
+# 角色列表输出的字段
+ROLE_LIST_FIELDS = ('id', 'name', 'code', 'create_time', 'update_time', 'remark')
+# 游标分页允许的排序列（必须非空）
+ROLE_CURSOR_ORDERINGS = ('id',)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(read_from_replica, name='dispatch')
 class SearchView(View):
     
     def post(self, request):
@@ -39,20 +64,42 @@ class SearchView(View):
             pageSize = data.get('pageSize', 10)
             query = data.get('query', '').strip()  # 去除前后空格
             
+            # 只查询、只返回 fields 指定的字段
+            try:
+                fields = parse_fields(data.get('fields'), ROLE_LIST_FIELDS)
+            except FieldsError as e:
+                return JsonResponse({'code': 400, 'errorInfo': str(e)})
+            
             # 构建查询，添加排序以避免分页警告
             queryset = SysRole.objects.all().order_by('id')
             
-            # 如果有查询条件，进行模糊搜索，按照角色名称来查询
+            # 如果有查询条件，进行模糊搜索，按照角色名称来查询（match 为 prefix 时按前缀匹配）
             if query:
-                queryset = queryset.filter(name__icontains=query)
+                queryset = search_filter(queryset, 'role', query, prefix=data.get('match') == 'prefix')
             
             # 如果有 id 参数，用于筛选
             if id:
                 queryset = queryset.filter(id=id)
             
+            # 总数按筛选条件缓存，sys_role 有写入时失效
+            count = lambda: cached_count(
+                'role:search', queryset, {'query': query.lower(), 'match': data.get('match'), 'id': id}, [SysRole]
+            )
+            
+            # 游标分页：请求中带 cursor 参数（首页传 null）时使用
+            if 'cursor' in data:
+                try:
+                    roles, page_info = cursor_page(
+                        queryset.values(*fields), data, pageSize,
+                        orderings=ROLE_CURSOR_ORDERINGS, filtered=bool(query or id), count=count
+                    )
+                except CursorError as e:
+                    return JsonResponse({'code': 400, 'errorInfo': str(e)})
+                return JsonResponse({'code': 200, 'roleList': roles, **page_info})
+            
             # 分页
             paginator = Paginator(queryset, pageSize)
-            total = paginator.count
+            paginator.count = total = count()
             
             try:
                 roleListPage = paginator.page(pageNum)
@@ -65,11 +112,8 @@ class SearchView(View):
                     'roleList': []
                 })
             
-            # 将 Page 对象中的模型实例转换为字典列表
-            # 明确指定所有需要的字段，确保包含 email 和 phonenumber
-            obj_roles = roleListPage.object_list.values(
-                'id', 'name', 'code', 'create_time', 'update_time', 'remark'
-            )
+            # 将 Page 对象中的模型实例转换为字典列表，只查询请求的字段
+            obj_roles = roleListPage.object_list.values(*fields)
             roles = list(obj_roles)
             return JsonResponse({
                 'code': 200, 
@@ -80,9 +124,7 @@ class SearchView(View):
             })
             
         except Exception as e:
-            import traceback
-            print(f"搜索角色错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("搜索角色错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'搜索失败：{str(e)}'})
 
 
@@ -122,6 +164,10 @@ class SaveView(View):
                     update_time=datetime.now().date()
                 )
                 obj_role.save()
+                index_objects('role', [(obj_role.id, obj_role.name)])
+                bump_table_versions(SysRole)
+                # 角色编码可能变化，超级管理员角色需要重新识别
+                invalidate_authorization_index()
                 return JsonResponse({'code': 200, 'info': '添加成功！'})
             else:
                 # 编辑角色
@@ -143,11 +189,13 @@ class SaveView(View):
                 obj_role.remark = remark
                 obj_role.update_time = datetime.now().date()
                 obj_role.save()
+                index_objects('role', [(obj_role.id, obj_role.name)])
+                bump_table_versions(SysRole)
+                # 角色编码可能变化，超级管理员角色需要重新识别
+                invalidate_authorization_index()
                 return JsonResponse({'code': 200, 'info': '修改成功！'})
         except Exception as e:
-            import traceback
-            print(f"保存角色错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("保存角色错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'操作失败：{str(e)}'})
 
 
@@ -172,6 +220,9 @@ class DeleteView(View):
             if obj_role.name == '超级管理员':
                 return JsonResponse({'code': 500, 'errorInfo': '不能删除超级管理员！'})
             
+            # 记录拥有该角色的用户，删除后使他们的权限缓存失效
+            user_ids = list(SysUserRole.objects.filter(role_id=role_id).values_list('user_id', flat=True))
+            
             # 先删除用户角色关联表中的记录（因为外键使用了 PROTECT）
             SysUserRole.objects.filter(role_id=role_id).delete()
             
@@ -180,15 +231,18 @@ class DeleteView(View):
             
             # 然后删除角色
             obj_role.delete()
+            remove_objects('role', [role_id])
+            bump_table_versions(SysRole)
+            invalidate_user_permissions(user_ids)
+            invalidate_authorization_index()
             return JsonResponse({'code': 200, 'info': '删除成功！'})
         except Exception as e:
-            import traceback
-            print(f"删除角色错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("删除角色错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'删除失败：{str(e)}'})
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(read_from_replica, name='dispatch')
 class GetRoleMenusView(View):
     """获取角色的菜单列表"""
     
@@ -215,13 +269,11 @@ class GetRoleMenusView(View):
             role_menus = SysRoleMenu.objects.filter(role_id=role_id).values_list('menu_id', flat=True)
             menu_ids = list(role_menus)
             
-            print(f"角色 {role_id} 已分配的菜单ID: {menu_ids}")
+            logger.debug("角色已分配的菜单", extra={'role_id': role_id, 'menu_count': len(menu_ids)})
             
             return JsonResponse({'code': 200, 'menuIds': menu_ids})
         except Exception as e:
-            import traceback
-            print(f"获取角色菜单错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("获取角色菜单错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'获取失败：{str(e)}'})
 
 
@@ -239,26 +291,29 @@ class AssignPermissionView(View):
                 return JsonResponse({'code': 500, 'errorInfo': '角色ID不能为空！'})
             
             # 验证角色是否存在
-            try:
-                obj_role = SysRole.objects.get(id=role_id)
-            except SysRole.DoesNotExist:
+            if not SysRole.objects.filter(id=role_id).exists():
                 return JsonResponse({'code': 500, 'errorInfo': '角色不存在！'})
             
-            # 先删除该角色的所有菜单关联
-            SysRoleMenu.objects.filter(role_id=role_id).delete()
+            # 与现有菜单求差集，只删除多余的、只插入缺少的（不存在的菜单ID忽略）
+            changes = sync_links(SysRoleMenu, 'role_id', role_id, 'menu_id', SysMenu, menu_ids)
             
-            # 添加新的菜单关联
-            if menu_ids and len(menu_ids) > 0:
-                for menu_id in menu_ids:
-                    try:
-                        menu = SysMenu.objects.get(id=menu_id)
-                        SysRoleMenu.objects.create(role=obj_role, menu=menu)
-                    except SysMenu.DoesNotExist:
-                        print(f"菜单ID {menu_id} 不存在，跳过")
+            # 角色菜单有变化时，使拥有该角色的用户的权限缓存失效
+            if changes['added'] or changes['removed']:
+                invalidate_role_permissions(role_id)
             
-            return JsonResponse({'code': 200, 'info': '权限分配成功！'})
+            return JsonResponse({'code': 200, 'info': '权限分配成功！', **changes})
         except Exception as e:
-            import traceback
-            print(f"分配权限错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("分配权限错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'分配权限失败：{str(e)}'})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExportView(View):
+    """流式导出全部角色（format=csv/ndjson）"""
+
+    def get(self, request):
+        chunks = iter_chunks(SysRole.objects.values(*ROLE_LIST_FIELDS))
+        try:
+            return export_response(request, chunks, ROLE_LIST_FIELDS, 'roles')
+        except ExportError as e:
+            return JsonResponse({'code': 400, 'errorInfo': str(e)})
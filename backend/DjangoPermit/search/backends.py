@@ -0,0 +1,228 @@
+"""
+用户名、角色名的子串/前缀搜索
+username__icontains 会生成 LIKE '%q%'，只能全表扫描。这里把搜索做成可替换的后端，由 settings.SEARCH_BACKEND 选择：
+  like            原有的 LIKE 查询，不维护索引
+  ngram           把搜索字段拆成长度 2~3 的片段存入 sys_search_gram，查询时先按片段求交集得到候选 id，
+                  再在候选行上用 LIKE 复核；单个字符的查询直接用 LIKE；MySQL 和 SQLite 都可用
+  mysql_fulltext  使用 MySQL 的 FULLTEXT ... WITH PARSER ngram 索引，同样在候选行上复核。
+                  索引只在迁移时 SEARCH_BACKEND 已经是 mysql_fulltext 才会创建，
+                  之后再切换的执行 python manage.py rebuild_search_index --backend mysql_fulltext
+新增、修改、删除用户和角色时调用 index_objects / remove_objects 同步索引。
+切换到 ngram 之前先执行 python manage.py rebuild_search_index 建立已有数据的索引。
+"""
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from search.models import SysSearchGram
+
+# 可搜索的对象类型 -> (模型, 搜索字段)
+SEARCHABLE = {
+    'user': ('user.SysUser', 'username'),
+    'role': ('role.SysRole', 'name'),
+}
+
+# 片段长度范围：单个字符在名称中太常见，索引行数最多、区分度最低，不建索引
+MIN_GRAM_SIZE = 2
+GRAM_SIZE = 3
+
+
+def get_searchable(object_type):
+    model_label, field = SEARCHABLE[object_type]
+    return apps.get_model(model_label), field
+
+
+def make_grams(text):
+    """
+    文本的全部 MIN_GRAM_SIZE~GRAM_SIZE 长度片段（小写、去重）
+    """
+    text = (text or '').lower()
+    grams = set()
+    for n in range(MIN_GRAM_SIZE, GRAM_SIZE + 1):
+        for i in range(len(text) - n + 1):
+            grams.add(text[i:i + n])
+    return grams
+
+
+def query_grams(query):
+    """
+    查询词的片段：取能用的最长片段长度，包含查询词的文本一定包含这些片段
+    查询词短于 MIN_GRAM_SIZE 时没有可用的片段，返回空集合
+    """
+    query = query.lower()
+    if len(query) < MIN_GRAM_SIZE:
+        return set()
+    n = min(GRAM_SIZE, len(query))
+    return {query[i:i + n] for i in range(len(query) - n + 1)}
+
+
+class LikeSearchBackend:
+    """
+    原有的 LIKE 查询
+    """
+
+    def filter(self, queryset, object_type, query, prefix=False):
+        _, field = get_searchable(object_type)
+        lookup = field + ('__istartswith' if prefix else '__icontains')
+        return queryset.filter(**{lookup: query})
+
+    def index(self, object_type, objects):
+        pass
+
+    def remove(self, object_type, ids):
+        pass
+
+    def rebuild(self, object_type, batch_size=1000):
+        return 0
+
+
+class NgramSearchBackend(LikeSearchBackend):
+    """
+    基于 sys_search_gram 的 n-gram 索引
+    """
+
+    # 长查询词只取部分片段求交集就足够精确，剩下的交给 LIKE 复核
+    max_grams = 4
+
+    def pick_grams(self, query):
+        grams = sorted(query_grams(query), key=query.lower().find)
+        if len(grams) <= self.max_grams:
+            return grams
+        step = (len(grams) - 1) / (self.max_grams - 1)
+        return [grams[round(i * step)] for i in range(self.max_grams)]
+
+    def filter(self, queryset, object_type, query, prefix=False):
+        # 候选行必须包含查询词的每个片段（每个片段一次索引查找），再用 LIKE 复核片段顺序、前缀和排序规则带来的误差；
+        # 单个字符的查询没有片段，直接 LIKE
+        for gram in self.pick_grams(query):
+            queryset = queryset.filter(
+                id__in=SysSearchGram.objects.filter(object_type=object_type, gram=gram).values('object_id')
+            )
+        return super().filter(queryset, object_type, query, prefix)
+
+    def index(self, object_type, objects, batch_size=1000):
+        """
+        :param objects: (id, 文本) 列表；已有索引的对象会先删除再重建
+        """
+        objects = list(objects)
+        if not objects:
+            return
+        with transaction.atomic():
+            SysSearchGram.objects.filter(
+                object_type=object_type, object_id__in=[object_id for object_id, _ in objects]
+            ).delete()
+            self._insert(object_type, objects, batch_size)
+
+    def _insert(self, object_type, objects, batch_size):
+        rows = [
+            SysSearchGram(object_type=object_type, object_id=object_id, gram=gram)
+            for object_id, text in objects for gram in make_grams(text)
+        ]
+        SysSearchGram.objects.bulk_create(rows, batch_size=batch_size)
+
+    def remove(self, object_type, ids):
+        SysSearchGram.objects.filter(object_type=object_type, object_id__in=list(ids)).delete()
+
+    def rebuild(self, object_type, batch_size=1000):
+        """
+        按主键分批重建某类对象的全部索引，返回建立索引的对象数
+        """
+        model, field = get_searchable(object_type)
+        SysSearchGram.objects.filter(object_type=object_type).delete()
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(
+                model.objects.filter(id__gt=last_id).order_by('id').values_list('id', field)[:batch_size]
+            )
+            if not batch:
+                return total
+            with transaction.atomic():
+                self._insert(object_type, batch, batch_size)
+            total += len(batch)
+            last_id = batch[-1][0]
+
+
+class MySQLFulltextSearchBackend(LikeSearchBackend):
+    """
+    MySQL FULLTEXT 索引（ngram 分词器）；索引由 MySQL 自动维护
+    查询词短于 ngram_token_size（默认 2）时无法使用全文索引，退回 LIKE
+    """
+    min_length = 2
+
+    def filter(self, queryset, object_type, query, prefix=False):
+        if connection.vendor != 'mysql' or len(query) < self.min_length:
+            return super().filter(queryset, object_type, query, prefix)
+        model, field = get_searchable(object_type)
+        column = connection.ops.quote_name(model._meta.get_field(field).column)
+        table = connection.ops.quote_name(model._meta.db_table)
+        # 用短语查询要求片段连续出现；去掉布尔模式下有特殊含义的双引号
+        phrase = '"%s"' % query.replace('"', ' ')
+        candidates = RawSQL(
+            'SELECT id FROM %s WHERE MATCH(%s) AGAINST (%%s IN BOOLEAN MODE)' % (table, column), [phrase]
+        )
+        return super().filter(queryset.filter(id__in=candidates), object_type, query, prefix)
+
+    def rebuild(self, object_type, batch_size=1000):
+        """
+        创建全文索引（已存在时跳过），已有数据由 MySQL 建立索引，返回对象数
+        """
+        if connection.vendor != 'mysql':
+            return 0
+        model, field = get_searchable(object_type)
+        table = model._meta.db_table
+        column = model._meta.get_field(field).column
+        index = 'ft_%s_%s' % (table, column)
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+                [table, index]
+            )
+            if cursor.fetchone() is None:
+                cursor.execute('ALTER TABLE %s ADD FULLTEXT INDEX %s (%s) WITH PARSER ngram' % (
+                    quote(table), quote(index), quote(column)))
+        return model.objects.count()
+
+
+BACKENDS = {
+    'like': LikeSearchBackend,
+    'ngram': NgramSearchBackend,
+    'mysql_fulltext': MySQLFulltextSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    name = settings.SEARCH_BACKEND
+    if _backend is None or _backend.name != name:
+        backend = BACKENDS[name]()
+        backend.name = name
+        _backend = backend
+    return _backend
+
+
+def search_filter(queryset, object_type, query, prefix=False):
+    """
+    在 queryset 上按搜索字段做子串（prefix=True 时为前缀）匹配
+    """
+    return get_search_backend().filter(queryset, object_type, query, prefix)
+
+
+def index_objects(object_type, objects):
+    """
+    新增或修改后同步索引
+    :param objects: (id, 文本) 列表
+    """
+    get_search_backend().index(object_type, objects)
+
+
+def remove_objects(object_type, ids):
+    """
+    删除后同步索引
+    """
+    get_search_backend().remove(object_type, ids)
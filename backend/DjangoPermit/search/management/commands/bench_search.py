@@ -0,0 +1,67 @@
+"""
+用户名搜索基准测试：LIKE 全表扫描 vs n-gram 索引（MySQL 上再加全文索引）
+在临时测试数据库中造指定数量的随机用户名，建立索引后对比子串、前缀、短查询词的查询耗时。
+用法：python manage.py bench_search --sizes 10000 100000 1000000
+"""
+import random
+import string
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from DjangoPermit.benchmark import throwaway_database, timeit
+from search.backends import LikeSearchBackend, MySQLFulltextSearchBackend, NgramSearchBackend
+from user.models import SysUser
+
+
+def random_username(rng):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 12)))
+
+
+class Command(BaseCommand):
+    help = '对比各搜索后端在不同用户量下的查询耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='用户数量')
+        parser.add_argument('--repeat', type=int, default=5, help='每个查询的执行轮数')
+
+    def handle(self, *args, **options):
+        backends = [('like', LikeSearchBackend()), ('ngram', NgramSearchBackend())]
+        if connection.vendor == 'mysql':
+            backends.append(('mysql_fulltext', MySQLFulltextSearchBackend()))
+        with throwaway_database():
+            self.run(options['sizes'], options['repeat'], backends)
+
+    def run(self, sizes, repeat, backends):
+        rng = random.Random(0)
+        ngram = NgramSearchBackend()
+        created = 0
+        for size in sorted(sizes):
+            # 在上一档数据的基础上补足到 size 个用户，索引只需追加新用户
+            new_users = SysUser.objects.bulk_create([
+                SysUser(username='%s%d' % (random_username(rng), i), password='x')
+                for i in range(created, size)
+            ], batch_size=2000)
+            if new_users and new_users[0].id is None:
+                # MySQL 的 bulk_create 不回填主键
+                new_users = SysUser.objects.filter(id__gt=created).order_by('id')
+            ngram._insert('user', [(user.id, user.username) for user in new_users], 2000)
+            created = size
+
+            sample = SysUser.objects.order_by('?').values_list('username', flat=True).first()
+            queries = [
+                ('子串(4字)', sample[1:5], False),
+                ('前缀(3字)', sample[:3], True),
+                ('短词(2字)', sample[2:4], False),
+                ('无结果', 'zzzzqq', False),
+            ]
+            self.stdout.write('\n用户数 %d' % size)
+            self.stdout.write('%-12s %-10s' % ('查询', '命中') + ''.join('%16s' % name for name, _ in backends))
+            for label, query, prefix in queries:
+                line = []
+                hits = None
+                for name, backend in backends:
+                    search = lambda: backend.filter(SysUser.objects.all(), 'user', query, prefix).count()
+                    elapsed, hits = timeit(search, repeat=repeat)
+                    line.append('%13.2fms' % (elapsed * 1000))
+                self.stdout.write('%-12s %-10d' % (label, hits) + ''.join('%16s' % cell for cell in line))
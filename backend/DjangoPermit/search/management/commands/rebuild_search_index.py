@@ -0,0 +1,29 @@
+"""
+重建搜索索引
+ngram：重建 sys_search_gram，首次启用 SEARCH_BACKEND = 'ngram'、或绕过接口直接改库（导入 db.sql 等）之后执行。
+mysql_fulltext：创建缺少的 FULLTEXT 索引，迁移之后才切换到 SEARCH_BACKEND = 'mysql_fulltext' 时执行。
+用法：python manage.py rebuild_search_index --type user --batch-size 2000
+      python manage.py rebuild_search_index --backend mysql_fulltext
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.backends import BACKENDS, SEARCHABLE
+
+
+class Command(BaseCommand):
+    help = '重建用户名、角色名的搜索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=sorted(SEARCHABLE), action='append', help='对象类型，默认全部')
+        parser.add_argument('--backend', choices=['ngram', 'mysql_fulltext'], default='ngram', help='搜索后端，默认 ngram')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批建立索引的对象数')
+
+    def handle(self, *args, **options):
+        backend = BACKENDS[options['backend']]()
+        for object_type in options['type'] or sorted(SEARCHABLE):
+            start = time.perf_counter()
+            total = backend.rebuild(object_type, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS('%s：%d 条，耗时 %.1f 秒' % (
+                object_type, total, time.perf_counter() - start)))
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SysSearchGram',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('object_type', models.CharField(max_length=10, verbose_name='对象类型')),
+                ('object_id', models.IntegerField(verbose_name='对象ID')),
+                ('gram', models.CharField(max_length=3, verbose_name='片段')),
+            ],
+            options={
+                'db_table': 'sys_search_gram',
+                'indexes': [models.Index(fields=['object_type', 'gram', 'object_id'], name='sys_search_gram_lookup'), models.Index(fields=['object_type', 'object_id'], name='sys_search_gram_object')],
+            },
+        ),
+    ]
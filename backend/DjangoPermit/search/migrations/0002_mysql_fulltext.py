@@ -0,0 +1,48 @@
+# MySQL 上为用户名、角色名创建 ngram 全文索引，只在 SEARCH_BACKEND = 'mysql_fulltext' 时创建，其他后端、其他数据库跳过
+# （不使用全文索引时它只会拖慢写入）。迁移之后才切换到 mysql_fulltext 的，执行
+# python manage.py rebuild_search_index --backend mysql_fulltext 创建
+
+from django.conf import settings
+from django.db import migrations
+
+FULLTEXT_INDEXES = (
+    ('sys_user', 'ft_sys_user_username', 'username'),
+    ('sys_role', 'ft_sys_role_name', 'name'),
+)
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql' or settings.SEARCH_BACKEND != 'mysql_fulltext':
+        return
+    for table, index, column in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            'ALTER TABLE `%s` ADD FULLTEXT INDEX `%s` (`%s`) WITH PARSER ngram' % (table, index, column)
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, index, column in FULLTEXT_INDEXES:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM information_schema.STATISTICS '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1',
+                [table, index]
+            )
+            exists = cursor.fetchone() is not None
+        if exists:
+            schema_editor.execute('ALTER TABLE `%s` DROP INDEX `%s`' % (table, index))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('user', '0003_alter_sysuser_options'),
+        ('role', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
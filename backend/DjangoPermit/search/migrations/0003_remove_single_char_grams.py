@@ -0,0 +1,21 @@
+# n-gram 索引不再保存长度为 1 的片段（单个字符的查询直接用 LIKE），删除已有的单字符片段
+
+from django.db import migrations
+from django.db.models.functions import Length
+
+
+def remove_single_char_grams(apps, schema_editor):
+    SysSearchGram = apps.get_model('search', 'SysSearchGram')
+    SysSearchGram.objects.annotate(length=Length('gram')).filter(length=1).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_mysql_fulltext'),
+    ]
+
+    operations = [
+        # 回滚时不恢复单字符片段，需要时执行 python manage.py rebuild_search_index
+        migrations.RunPython(remove_single_char_grams, migrations.RunPython.noop),
+    ]
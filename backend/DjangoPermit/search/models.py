@@ -0,0 +1,16 @@
+from django.db import models
+
+
+# 搜索用的 n-gram 索引：每个对象的搜索字段拆成长度 2~3 的片段，一行一个片段
+class SysSearchGram(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    object_type = models.CharField(max_length=10, verbose_name="对象类型")  # user / role
+    object_id = models.IntegerField(verbose_name="对象ID")
+    gram = models.CharField(max_length=3, verbose_name="片段")
+
+    class Meta:
+        db_table = "sys_search_gram"
+        indexes = [
+            models.Index(fields=['object_type', 'gram', 'object_id'], name='sys_search_gram_lookup'),
+            models.Index(fields=['object_type', 'object_id'], name='sys_search_gram_object'),
+        ]
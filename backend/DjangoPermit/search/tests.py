@@ -0,0 +1,56 @@
+from django.db.models.functions import Length
+from django.test import TestCase, override_settings
+
+from role.models import SysRole, SysUserRole
+from search.backends import NgramSearchBackend, make_grams, query_grams
+from search.models import SysSearchGram
+from user.models import SysUser
+
+
+class NgramSearchBackendTest(TestCase):
+    """n-gram 索引与 LIKE 查询结果一致，并随用户增删同步"""
+
+    @classmethod
+    def setUpTestData(cls):
+        names = ['python222', 'Alice', 'alicia', 'bob', 'malice', 'xy']
+        cls.users = {name: SysUser.objects.create(username=name, password='x') for name in names}
+        role = SysRole.objects.create(name='超级管理员', code='admin')
+        SysUserRole.objects.create(user=cls.users['python222'], role=role)
+        NgramSearchBackend().rebuild('user')
+
+    def search(self, query, prefix=False):
+        queryset = NgramSearchBackend().filter(SysUser.objects.all(), 'user', query, prefix)
+        return sorted(queryset.values_list('username', flat=True))
+
+    def test_grams(self):
+        self.assertEqual(make_grams('Abcd'), {'ab', 'bc', 'cd', 'abc', 'bcd'})
+        self.assertEqual(make_grams('A'), set())
+        self.assertEqual(query_grams('alic'), {'ali', 'lic'})
+        self.assertEqual(query_grams('y'), set())
+
+    def test_single_char_not_indexed(self):
+        self.assertFalse(SysSearchGram.objects.annotate(length=Length('gram')).filter(length__lt=2).exists())
+        self.assertEqual(self.search('X'), ['xy'])
+        self.assertEqual(self.search('a', prefix=True), ['Alice', 'alicia'])
+
+    def test_substring_matches_like(self):
+        for query in ['ali', 'LICE', 'li', 'x', 'ice', 'lia', 'zzz', 'python222']:
+            expected = sorted(SysUser.objects.filter(username__icontains=query).values_list('username', flat=True))
+            self.assertEqual(self.search(query), expected, query)
+
+    def test_prefix(self):
+        self.assertEqual(self.search('ali', prefix=True), ['Alice', 'alicia'])
+
+    @override_settings(SEARCH_BACKEND='ngram')
+    def test_views_keep_index_in_sync(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        token = str(RefreshToken.for_user(self.users['python222']).access_token)
+        headers = {'content_type': 'application/json', 'HTTP_AUTHORIZATION': 'Bearer ' + token}
+
+        self.client.post('/user/save', {'id': -1, 'username': 'zoe', 'password': 'p'}, **headers)
+        zoe = SysUser.objects.get(username='zoe')
+        response = self.client.post('/user/search', {'pageNum': 1, 'pageSize': 10, 'query': 'zo'}, **headers)
+        self.assertEqual([user['username'] for user in response.json()['userList']], ['zoe'])
+
+        self.client.post('/user/delete', {'id': zoe.id}, **headers)
+        self.assertFalse(SysSearchGram.objects.filter(object_type='user', object_id=zoe.id).exists())
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        # 注册 token 黑名单的信号处理（refresh token 拉黑后同步吊销）
+        from user import middleware  # noqa: F401
@@ -0,0 +1,105 @@
+"""
+用户批量操作（修改状态、删除、重置密码）
+单条接口每次都是 get() 加整行 save()，停用一个部门的 2000 个帐号就是 2000 个请求。
+这里按块执行集合操作：UPDATE ... WHERE id IN (...)、批量删除 sys_user_role 关联，
+超级管理员保护也按集合检查，并返回每个ID的处理结果。
+"""
+from django.db import transaction
+
+from DjangoPermit.counts import bump_table_versions
+from DjangoPermit.links import parse_ids
+from menu.permission import invalidate_user_permissions
+from role.models import SysUserRole
+from search.backends import remove_objects
+from user.hashing import make_passwords
+from user.models import SysUser
+
+BATCH_CHUNK_SIZE = 500
+# 受保护的帐号，不能被批量删除或停用
+PROTECTED_USERNAMES = ('python222',)
+
+OK = 'ok'
+NOT_FOUND = 'not_found'
+PROTECTED = 'protected'
+INVALID = 'invalid'
+
+
+def _chunks(items, size=BATCH_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _classify(ids, protect):
+    """
+    按块查询用户是否存在、是否受保护
+    :return: (合法ID的结果 {id: 结果}, 无法解析的ID列表, 可以操作的ID列表)
+    """
+    ids, invalid = parse_ids(ids)
+    outcomes = {}
+    targets = []
+    for chunk in _chunks(ids):
+        usernames = dict(SysUser.objects.filter(id__in=chunk).values_list('id', 'username'))
+        for user_id in chunk:
+            if user_id not in usernames:
+                outcomes[user_id] = NOT_FOUND
+            elif protect and usernames[user_id] in PROTECTED_USERNAMES:
+                outcomes[user_id] = PROTECTED
+            else:
+                outcomes[user_id] = OK
+                targets.append(user_id)
+    return outcomes, invalid, targets
+
+
+def _results(outcomes, invalid):
+    """
+    每个ID的结果：先是合法ID（按请求顺序），再是无法解析的ID
+    """
+    results = [{'id': user_id, 'result': outcome} for user_id, outcome in outcomes.items()]
+    results += [{'id': value, 'result': INVALID} for value in invalid]
+    return {
+        'succeeded': sum(1 for outcome in outcomes.values() if outcome == OK),
+        'results': results,
+    }
+
+
+def batch_update_status(ids, status):
+    """
+    批量修改帐号状态（停用时跳过受保护帐号）
+    """
+    outcomes, invalid, targets = _classify(ids, protect=status != 0)
+    for chunk in _chunks(targets):
+        SysUser.objects.filter(id__in=chunk).update(status=status)
+    return _results(outcomes, invalid)
+
+
+def batch_delete(ids):
+    """
+    批量删除用户及其角色关联，每块一个事务
+    """
+    outcomes, invalid, targets = _classify(ids, protect=True)
+    for chunk in _chunks(targets):
+        with transaction.atomic():
+            # 先删除用户角色关联表中的记录（因为外键使用了 PROTECT）
+            SysUserRole.objects.filter(user_id__in=chunk).delete()
+            SysUser.objects.filter(id__in=chunk).delete()
+        remove_objects('user', chunk)
+        invalidate_user_permissions(chunk)
+    if targets:
+        bump_table_versions(SysUser)
+    return _results(outcomes, invalid)
+
+
+def batch_reset_password(ids, raw_password, pool=None):
+    """
+    批量重置密码，每个用户单独加密（各自的盐），重置后的帐号不会共用同一个哈希值
+    :param raw_password: 重置后的明文密码
+    :param pool: 加密密码用的进程池，None 时使用批量哈希线程池
+    """
+    outcomes, invalid, targets = _classify(ids, protect=False)
+    for chunk in _chunks(targets):
+        hashed = make_passwords(pool, [raw_password] * len(chunk))
+        SysUser.objects.bulk_update(
+            [SysUser(id=user_id, password=password) for user_id, password in zip(chunk, hashed)],
+            ['password'],
+        )
+    return _results(outcomes, invalid)
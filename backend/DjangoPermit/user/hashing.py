@@ -0,0 +1,78 @@
+"""
+密码哈希线程池
+PBKDF2 是 CPU 密集型计算，放在请求线程（或 ASGI 事件循环）里执行时，
+一波集中登录会占满 worker，其他请求全部排队。这里把哈希和校验放到有界线程池中执行：
+hashlib.pbkdf2_hmac 计算期间会释放 GIL，线程池可以真正并行，同时池大小限制了哈希占用的 CPU。
+批量导入、批量重置密码使用单独的线程池，一次导入上万行时登录的哈希不需要排在它们后面；
+批量离线任务（如历史明文密码重新加密）则使用进程池。
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from DjangoPermit.metrics import timed
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix='password-hash',
+)
+
+_bulk_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_BULK_HASH_WORKERS,
+    thread_name_prefix='password-bulk-hash',
+)
+
+
+async def acheck_password(raw_password, encoded):
+    """
+    在线程池中校验密码，不阻塞事件循环
+    """
+    loop = asyncio.get_running_loop()
+    with timed('hash'):
+        return await loop.run_in_executor(_executor, check_password, raw_password, encoded)
+
+
+async def amake_password(raw_password):
+    """
+    在线程池中生成密码哈希，不阻塞事件循环
+    """
+    loop = asyncio.get_running_loop()
+    with timed('hash'):
+        return await loop.run_in_executor(_executor, make_password, raw_password)
+
+
+def _init_process_worker(settings_module):
+    """
+    进程池初始化：spawn 方式（Windows）启动的子进程需要重新加载 Django 配置
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def create_process_pool(workers=None):
+    """
+    创建用于批量哈希的进程池（管理命令、批量导入等离线任务使用）
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_process_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'DjangoPermit.settings'),),
+    )
+
+
+def make_passwords(pool, raw_passwords):
+    """
+    在进程池中批量生成密码哈希，结果顺序与输入一致
+    pool 为 None 时使用批量哈希线程池（PBKDF2 计算期间释放 GIL，同样可以并行），不占用登录的线程池
+    """
+    if pool is None:
+        pool = _bulk_executor
+    raw_passwords = list(raw_passwords)
+    workers = getattr(pool, '_max_workers', None) or 1
+    chunksize = max(1, len(raw_passwords) // (workers * 4))
+    with timed('hash'):
+        return list(pool.map(make_password, raw_passwords, chunksize=chunksize))
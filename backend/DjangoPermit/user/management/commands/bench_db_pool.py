@@ -0,0 +1,96 @@
+"""
+数据库连接池压测：对比开启/关闭连接池时的每秒请求数
+在进程内用若干线程通过 Django 测试客户端反复请求一个轻量接口（默认 GET /role/searchAllRole/），
+每个请求结束时 Django 会关闭连接：关闭连接池时每个请求都重新建立 TCP 连接并认证，开启时归还到连接池复用。
+需要 DATABASES['default'] 使用 DjangoPermit.db_backends.mysql_pool 且能连上 MySQL（或 MariaDB/TiDB 等兼容服务，
+本地可用 docker run -e MYSQL_ROOT_PASSWORD=123456 -p 3306:3306 mariadb 临时起一个）。
+只读请求，不会修改数据。
+用法：python manage.py bench_db_pool --username python222 --threads 8 --duration 10
+"""
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from DjangoPermit.db_backends.mysql_pool.pool import dispose_pools, pool_stats
+from user.models import SysUser
+
+POOL_ENGINE = 'DjangoPermit.db_backends.mysql_pool'
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = '对比开启/关闭数据库连接池时的吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='用于生成 token 的用户')
+        parser.add_argument('--path', default='/role/searchAllRole/', help='压测的接口')
+        parser.add_argument('--threads', type=int, default=8, help='并发线程数')
+        parser.add_argument('--duration', type=float, default=10.0, help='每种模式持续的秒数')
+
+    def handle(self, *args, **options):
+        if connection.settings_dict['ENGINE'] != POOL_ENGINE:
+            raise CommandError('DATABASES[\'default\'][\'ENGINE\'] 需要是 %s' % POOL_ENGINE)
+        try:
+            user = SysUser.objects.get(username=options['username'])
+        except SysUser.DoesNotExist:
+            raise CommandError('用户不存在：%s' % options['username'])
+        connection.close()
+        token = str(RefreshToken.for_user(user).access_token)
+
+        setup_test_environment()
+        try:
+            for label, enabled in (('不使用连接池', False), ('使用连接池', True)):
+                dispose_pools()
+                # 新线程按 settings_dict 创建各自的连接对象，直接修改开关即可
+                connection.settings_dict.setdefault('POOL', {})['ENABLED'] = enabled
+                latencies, errors, elapsed = self.run(options['path'], token, options['threads'], options['duration'])
+                self.stdout.write('%s：%d 个请求，%.1f 请求/秒，p50 %.2f ms，p99 %.2f ms，失败 %d' % (
+                    label, len(latencies), len(latencies) / elapsed,
+                    percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, errors))
+            for alias, stats in pool_stats().items():
+                self.stdout.write('连接池 %s：%s' % (alias, stats))
+        finally:
+            teardown_test_environment()
+
+    def run(self, path, token, threads, duration):
+        stop = threading.Event()
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            client = Client(HTTP_AUTHORIZATION='Bearer ' + token)
+            mine = []
+            failed = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                response = client.get(path)
+                if response.status_code == 200 and response.json().get('code') == 200:
+                    mine.append(time.perf_counter() - start)
+                else:
+                    failed += 1
+            with lock:
+                latencies.extend(mine)
+                errors.append(failed)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in workers:
+            thread.join()
+        return latencies, sum(errors), time.perf_counter() - start
@@ -0,0 +1,92 @@
+"""
+集中登录压测：观察登录风暴期间普通请求的延迟
+先登录一次拿到 token，测量空闲时普通请求（默认 GET /menu/search）的延迟作为基线，
+再开启若干并发登录线程持续调用 /user/login/，同时继续测量普通请求的延迟。
+分别对 WSGI（gunicorn 同步 worker）和 ASGI（uvicorn worker）启动的服务各跑一次即可对比。
+用法：python manage.py bench_login_storm --url http://127.0.0.1:8000 --username python222 --password 123456
+"""
+import json
+import threading
+import time
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = '集中登录期间普通请求的延迟压测'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='服务地址')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--probe-path', default='/menu/search', help='用于测量延迟的普通请求')
+        parser.add_argument('--logins', type=int, default=32, help='并发登录线程数')
+        parser.add_argument('--duration', type=float, default=10.0, help='每个阶段持续的秒数')
+
+    def handle(self, *args, **options):
+        self.base_url = options['url'].rstrip('/')
+        self.credentials = json.dumps({'username': options['username'], 'password': options['password']}).encode()
+        result = self.login()
+        if result.get('code') != 200:
+            raise CommandError('登录失败：%s' % result)
+        self.token = result['token']
+        probe_path = options['probe_path']
+        duration = options['duration']
+
+        self.stdout.write('阶段一：无登录压力，测量 %s' % probe_path)
+        baseline = self.probe(probe_path, duration)
+        self.report('空闲', baseline)
+
+        self.stdout.write('阶段二：%d 个线程持续登录，同时测量 %s' % (options['logins'], probe_path))
+        stop = threading.Event()
+        login_counts = []
+        workers = [threading.Thread(target=self.login_loop, args=(stop, login_counts)) for _ in range(options['logins'])]
+        for worker in workers:
+            worker.start()
+        try:
+            storm = self.probe(probe_path, duration)
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.report('登录风暴', storm)
+        self.stdout.write('登录吞吐：%.1f 次/秒' % (sum(login_counts) / duration))
+
+    def login(self):
+        request = urllib.request.Request(
+            self.base_url + '/user/login/', data=self.credentials,
+            headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.loads(response.read())
+
+    def login_loop(self, stop, login_counts):
+        count = 0
+        while not stop.is_set():
+            self.login()
+            count += 1
+        login_counts.append(count)
+
+    def probe(self, path, duration):
+        latencies = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            request = urllib.request.Request(self.base_url + path, headers={'Authorization': 'Bearer ' + self.token})
+            start = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    def report(self, label, latencies):
+        self.stdout.write('%s：%d 次请求，p50 %.1fms，p95 %.1fms，p99 %.1fms，max %.1fms' % (
+            label, len(latencies), percentile(latencies, 50), percentile(latencies, 95),
+            percentile(latencies, 99), max(latencies) if latencies else 0.0))
@@ -0,0 +1,104 @@
+"""
+批量加密历史明文密码
+从 db.sql 之类的数据导入后，sys_user 中会有大量明文密码，SysUser.save 只会在写入时逐条加密。
+本命令按主键顺序分块扫描 sys_user，在进程池中并行加密明文密码，再用 bulk_update 分批写回。
+每块提交后把最后的主键写入检查点文件，中断后再次执行会从检查点继续。
+用法：python manage.py rehash_passwords --chunk-size 2000 --workers 8 --checkpoint rehash.checkpoint
+"""
+import os
+import time
+
+from django.contrib.auth.hashers import identify_hasher
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from user.hashing import create_process_pool, make_passwords
+from user.models import SysUser
+
+
+def is_plaintext(password):
+    if not password:
+        return False
+    try:
+        identify_hasher(password)
+        return False
+    except (ValueError, KeyError):
+        return True
+
+
+class Command(BaseCommand):
+    help = '并行加密 sys_user 中的明文密码（可断点续跑）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='每块扫描的用户数')
+        parser.add_argument('--workers', type=int, default=None, help='进程数，默认 CPU 核数')
+        parser.add_argument('--checkpoint', default=None, help='检查点文件，记录已处理的最大用户ID')
+        parser.add_argument('--start-id', type=int, default=0, help='从大于该ID的用户开始（没有检查点时生效）')
+        parser.add_argument('--dry-run', action='store_true', help='只统计明文密码数量，不写回')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        checkpoint = options['checkpoint']
+        last_id = self.read_checkpoint(checkpoint) if checkpoint else None
+        if last_id is None:
+            last_id = options['start_id']
+        else:
+            self.stdout.write('从检查点继续：用户ID > %d' % last_id)
+
+        scanned = 0
+        rehashed = 0
+        start = time.perf_counter()
+        with create_process_pool(options['workers']) as pool:
+            while True:
+                rows = list(
+                    SysUser.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'password')[:chunk_size]
+                )
+                if not rows:
+                    break
+                plaintext = [(user_id, password) for user_id, password in rows if is_plaintext(password)]
+                if plaintext and not options['dry_run']:
+                    hashed = make_passwords(pool, [password for _, password in plaintext])
+                    rehashed += self.write_back(plaintext, hashed)
+                elif options['dry_run']:
+                    rehashed += len(plaintext)
+                scanned += len(rows)
+                last_id = rows[-1][0]
+                if checkpoint and not options['dry_run']:
+                    self.write_checkpoint(checkpoint, last_id)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write('已扫描 %d，已加密 %d，当前ID %d，%.0f 行/秒' % (
+                    scanned, rehashed, last_id, scanned / elapsed if elapsed else 0))
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS('完成：扫描 %d，%s %d，耗时 %.1f 秒' % (
+            scanned, '明文' if options['dry_run'] else '加密', rehashed, elapsed)))
+
+    def write_back(self, plaintext, hashed):
+        """
+        写回加密结果：加锁重新读取这一块，跳过在加密期间已被修改过密码的用户
+        """
+        original = dict(plaintext)
+        hashed_map = {user_id: password for (user_id, _), password in zip(plaintext, hashed)}
+        with transaction.atomic():
+            current = SysUser.objects.select_for_update().filter(id__in=list(original)).values_list('id', 'password')
+            users = [
+                SysUser(id=user_id, password=hashed_map[user_id])
+                for user_id, password in current
+                if password == original[user_id]
+            ]
+            SysUser.objects.bulk_update(users, ['password'], batch_size=500)
+        return len(users)
+
+    def read_checkpoint(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            content = f.read().strip()
+        return int(content) if content else None
+
+    def write_checkpoint(self, path, last_id):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(last_id))
+        os.replace(tmp_path, path)
@@ -1,41 +1,130 @@
-from django.utils.deprecation import MiddlewareMixin
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from jwt import ExpiredSignatureError, PyJWTError
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from DjangoPermit.lru import LRUCache
+from menu.authorization import get_authorization_index
+from menu.permission import get_token_permissions
+
+# 已验证 token 的缓存：token 的 SHA-256 摘要 -> 解码后的 claims
+# 同一个 token 在一次会话中会被反复发送，命中缓存时不再重复验签；条目最晚在 token 的 exp 时过期
+_token_cache = LRUCache(maxsize=settings.JWT_TOKEN_CACHE_SIZE)
+
+# 已吊销 token 的 jti，保存在共享缓存中直到 token 过期，所有进程都能看到。
+# 每次请求（包括命中上面的本地缓存时）都会检查，吊销立即生效，不必等本地缓存的条目过期
+REVOKED_KEY = 'jwt:revoked:%s'
+
+
+def revoke_token(jti, expires_at):
+    """
+    吊销 token
+    :param jti: token 的 jti
+    :param expires_at: token 过期的时间戳（秒），过期之后 token 本身就无法通过验证，不必再记录
+    """
+    timeout = int(expires_at - time.time()) + 1
+    if timeout > 0:
+        cache.set(REVOKED_KEY % jti, True, timeout)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def _revoke_blacklisted(sender, instance, created, **kwargs):
+    # refresh token 被拉黑（注销、轮换后 BLACKLIST_AFTER_ROTATION）时同步吊销
+    if created:
+        revoke_token(instance.token.jti, instance.token.expires_at.timestamp())
+
+
+def verify_token(token):
+    """
+    验证 token 并返回 claims，验证结果按摘要缓存
+    验证失败或 token 已被吊销、拉黑时抛出与 UntypedToken 相同的异常
+    """
+    digest = hashlib.sha256(token.encode('utf-8')).digest()
+    claims = _token_cache.get(digest)
+    if claims is None:
+        claims = UntypedToken(token).payload
+        # UntypedToken 不检查黑名单，refresh token 首次验证时查一次 token_blacklist
+        if claims.get(api_settings.TOKEN_TYPE_CLAIM) == 'refresh' and BlacklistedToken.objects.filter(
+                token__jti=claims.get(api_settings.JTI_CLAIM)).exists():
+            raise TokenError('Token is blacklisted')
+        expires_at = time.time() + settings.JWT_TOKEN_CACHE_TTL
+        if 'exp' in claims:
+            expires_at = min(expires_at, claims['exp'])
+        _token_cache.set(digest, claims, expires_at)
+    jti = claims.get(api_settings.JTI_CLAIM)
+    if jti is not None and cache.get(REVOKED_KEY % jti):
+        raise TokenError('Token is revoked')
+    return claims
+
+
+def token_cache_stats():
+    return _token_cache.stats()
+
 
 class JwtAuthenticationMiddleware(MiddlewareMixin):
+    # /metrics 由 METRICS_ALLOWED_IPS 限制访问来源，供本机的 Prometheus 抓取
+    white_list = ["/user/login/", "/metrics"]
+
     def process_request(self, request):
-        # 所有 JWT 相关的导入都移到函数内部
-        from rest_framework_simplejwt.tokens import UntypedToken
-        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-        from jwt import ExpiredSignatureError, PyJWTError
-        
-        white_list = ["/user/login/"]
         path = request.path
-        if path not in white_list and not path.startswith("/media"):
-            print("要进行token验证")
-            # print("request.META:", request.META)
-            auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-            print("Authorization header:", auth_header)
-            
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-            else:
-                token = auth_header
-            
-            if not token:
-                return HttpResponse('缺少 Token，请先登录！', status=401)
-            
-            print("提取的 token:", token[:20] + '...' if len(token) > 20 else token)
-            
-            try:
-                # 使用 UntypedToken 验证 token
-                UntypedToken(token)
-                print("Token 验证成功")
-            except ExpiredSignatureError:
-                return HttpResponse('Token过期，请重新登录！', status=401)
-            except (InvalidToken, TokenError):
-                return HttpResponse('Token验证失败！', status=401)
-            except PyJWTError as e:
-                return HttpResponse(f'Token验证异常：{str(e)}', status=401)
+        if path in self.white_list or path.startswith("/media"):
+            return None
+
+        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+        if auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
         else:
-            print("不需要token验证")
-            return None
\ No newline at end of file
+            token = auth_header
+
+        if not token:
+            return HttpResponse('缺少 Token，请先登录！', status=401)
+
+        try:
+            claims = verify_token(token)
+        except ExpiredSignatureError:
+            return HttpResponse('Token过期，请重新登录！', status=401)
+        except (InvalidToken, TokenError):
+            return HttpResponse('Token验证失败！', status=401)
+        except PyJWTError as e:
+            return HttpResponse(f'Token验证异常：{str(e)}', status=401)
+
+        # 把 claims 挂到 request 上，后续视图无需再次解码 token
+        request.jwt_claims = claims
+        user_id = claims.get(api_settings.USER_ID_CLAIM)
+        request.user_id = int(user_id) if user_id is not None else None
+        return None
+
+
+class PermissionMiddleware(MiddlewareMixin):
+    """
+    接口权限校验：根据路由查接口权限索引，再检查当前用户缓存的权限集合，默认拒绝
+    必须放在 JwtAuthenticationMiddleware 之后（依赖 request.user_id）
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        user_id = getattr(request, 'user_id', None)
+        if user_id is None or request.resolver_match is None:
+            return None
+        index = get_authorization_index()
+        route = request.resolver_match.route
+        if route not in index.route_perms:
+            # 没有登记的路由（没有名称）默认拒绝
+            return HttpResponse('没有操作权限！', status=403)
+        perm = index.route_perms[route]
+        if perm is None:
+            return None
+        # 优先使用 token 中的角色授权，token 过期（权限版本变化）时回退到缓存查询
+        permissions = get_token_permissions(user_id, getattr(request, 'jwt_claims', {}))
+        if perm in permissions['perms'] or not index.superuser_role_ids.isdisjoint(permissions['role_ids']):
+            return None
+        return HttpResponse('没有操作权限！', status=403)
@@ -6,6 +6,8 @@ from django.core.exceptions import ValidationError
 import re
 from rest_framework import serializers
 
+from user import hashing
+
 class SysUser(AbstractBaseUser):  # 改为继承 AbstractBaseUser
     id = models.AutoField(primary_key=True)
     username = models.CharField(max_length=100, unique=True, verbose_name="用户名")
@@ -78,6 +80,21 @@ class SysUser(AbstractBaseUser):  # 改为继承 AbstractBaseUser
         else:
             return raw_password == self.password
 
+    async def aset_password(self, raw_password):
+        """
+        set_password 的异步版本，哈希计算在密码哈希线程池中执行
+        """
+        self.password = await hashing.amake_password(raw_password)
+
+    async def acheck_password(self, raw_password):
+        """
+        check_password 的异步版本，哈希校验在密码哈希线程池中执行
+        """
+        if self.is_password_hashed():
+            return await hashing.acheck_password(raw_password, self.password)
+        else:
+            return raw_password == self.password
+
     def validate_password_strength(self, password):
         """
         密码强度验证（可选）
@@ -1,6 +1,7 @@
 from django.urls import path
 
-from user.views import TestView, JwtTestView, LoginView, PwdView, SaveView, AvatarView, UploadImageView, SearchView, UpdateStatusView, DeleteView, ResetPasswordView, AssignRoleView
+from user.views import TestView, JwtTestView, LoginView, PwdView, SaveView, AvatarView, UploadImageView, SearchView, UpdateStatusView, DeleteView, ResetPasswordView, AssignRoleView, ExportView, ImportView, \
+    BatchUpdateStatusView, BatchDeleteView, BatchResetPasswordView
 
 urlpatterns = [
     path('test/', TestView.as_view(), name='test'),  # 测试
@@ -15,4 +16,9 @@ urlpatterns = [
     path('resetPassword', ResetPasswordView.as_view(), name='resetPassword'),  # 重置密码
     path('delete', DeleteView.as_view(), name='delete'),  # 删除用户
     path('assignRole', AssignRoleView.as_view(), name='assignRole'),  # 分配角色
-]
\ No newline at end of file
+    path('export', ExportView.as_view(), name='export'),  # 导出用户（CSV/NDJSON）
+    path('import', ImportView.as_view(), name='import'),  # 批量导入用户（CSV/NDJSON）
+    path('batchUpdateStatus', BatchUpdateStatusView.as_view(), name='batchUpdateStatus'),  # 批量修改用户状态
+    path('batchDelete', BatchDeleteView.as_view(), name='batchDelete'),  # 批量删除用户
+    path('batchResetPassword', BatchResetPasswordView.as_view(), name='batchResetPassword'),  # 批量重置密码
+]
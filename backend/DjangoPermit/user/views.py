@@ -1,8 +1,11 @@
+import csv
 import json
+import logging
 import os
-from django.http import JsonResponse
+from DjangoPermit.http import JsonResponse
 from django.shortcuts import render
 from django.views import View
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.conf import settings
@@ -10,57 +13,26 @@ from rest_framework_simplejwt.tokens import RefreshToken
 
 from user.models import SysUser,SysUserSerializer
 from role.models import SysRole, SysRoleSerializer, SysUserRole
-from menu.models import SysMenu, SysMenuSerializer
+from menu.permission import embed_permission_claims, invalidate_user_permissions
 from django.core.paginator import Paginator
+from DjangoPermit.counts import bump_table_versions, cached_count
+from DjangoPermit.export import ExportError, export_response, iter_chunks
+from DjangoPermit.fieldsets import FieldsError, parse_fields
+from DjangoPermit.links import sync_links
+from DjangoPermit.loaders import attach_related
+from user.batch import batch_delete, batch_reset_password, batch_update_status
+from user.importer import ImportFormatError, detect_format, import_users, parse_rows
+from DjangoPermit.pagination import CursorError, cursor_page
+from DjangoPermit.routers import read_from_replica
+from role.loaders import load_user_roles
+from search.backends import index_objects, remove_objects, search_filter
+
+logger = logging.getLogger(__name__)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class LoginView(View):
 
-    def buildTreeMenu(self, sysMenuList):
-        resultMenuList: list[SysMenu] = list()
-        for menu in sysMenuList:
-            # 寻找子节点
-            for e in sysMenuList:
-                if e.parent_id == menu.id:
-                    # 判断当前menu下面是否存在children属性
-                    if not hasattr(menu, "children"):
-                        menu.children = list()
-                    menu.children.append(e)
-            # 判断父节点，添加到集合
-            if menu.parent_id == 0:
-                resultMenuList.append(menu)
-        return resultMenuList
-    
-    def printTreeMenu(self, menuList, level=0, prefix=""):
-        """
-        递归打印菜单树结构
-        :param menuList: 菜单列表
-        :param level: 当前层级（用于缩进）
-        :param prefix: 前缀符号（用于显示树形结构）
-        """
-        for i, menu in enumerate(menuList):
-            # 判断是否是最后一个节点
-            is_last = (i == len(menuList) - 1)
-            # 当前节点的连接符号
-            current_prefix = "└── " if is_last else "├── "
-            # 子节点的缩进前缀
-            child_prefix = prefix + ("    " if is_last else "│   ")
-            
-            # 打印当前菜单信息
-            menu_info = f"{prefix}{current_prefix}[ID:{menu.id}] {menu.name}"
-            if menu.path:
-                menu_info += f" (path: {menu.path})"
-            if menu.menu_type:
-                menu_info += f" [类型: {menu.menu_type}]"
-            if menu.order_num is not None:
-                menu_info += f" [排序: {menu.order_num}]"
-            print(menu_info)
-            
-            # 递归打印子节点
-            if hasattr(menu, "children") and menu.children:
-                self.printTreeMenu(menu.children, level + 1, child_prefix)
-    
-    def post(self, request):
+    async def post(self, request):
         # 支持多种方式获取参数：请求体（JSON/表单）和查询字符串
         username = None
         password = None
@@ -79,10 +51,10 @@ class LoginView(View):
                 username = request.POST.get("username")
                 password = request.POST.get("password")
         except json.JSONDecodeError as e:
-            print(f"JSON 解析错误: {e}")
+            logger.info("登录请求 JSON 解析错误: %s", e)
             return JsonResponse({'code': 400, 'info': f'JSON 格式错误: {str(e)}'})
         except Exception as e:
-            print(f"参数获取错误: {e}")
+            logger.warning("登录参数获取错误: %s", e)
         
         # 3. 如果请求体中没有，尝试从查询字符串获取（兼容 Postman 的 Params 方式）
         if not username:
@@ -90,13 +62,9 @@ class LoginView(View):
         if not password:
             password = request.GET.get("password")
         
-        # 调试信息
-        print(f"接收到的参数 - username: {username}, password: {'***' if password else None}")
-        print(f"Content-Type: {request.content_type}")
-        print(f"Request body: {request.body}")
-        print(f"Query params: {request.GET}")
-        
+        # 登录日志只记录用户名和结果，不记录请求体、查询参数（其中有明文密码）
         if not username or not password:
+            logger.info("登录失败：用户名或密码为空", extra={'username': username})
             return JsonResponse({
                 'code': 400, 
                 'info': '用户名和密码不能为空',
@@ -110,84 +78,28 @@ class LoginView(View):
             })
         try:
             # 先通过用户名查找用户
-            print(f"尝试查找用户: {username}")
-            user = SysUser.objects.get(username=username)
-            print(f"找到用户: {user.username}, ID: {user.id}")
+            user = await SysUser.objects.aget(username=username)
             
-            # 使用 check_password 方法验证密码（支持加密和明文密码）
-            print(f"验证密码...")
-            if not user.check_password(password):
-                print(f"密码验证失败")
+            # 使用 acheck_password 方法验证密码（支持加密和明文密码），哈希校验在线程池中执行，不阻塞事件循环
+            if not await user.acheck_password(password):
+                logger.info("登录失败：密码错误", extra={'username': username, 'user_id': user.id})
                 return JsonResponse({'code': 500, 'info': '用户名或者密码错误！'})
-            print(f"密码验证成功")
             
             # 使用 SimpleJWT 的 RefreshToken 生成 token
-            refresh_token = RefreshToken.for_user(user)
-            access_token = str(refresh_token.access_token)
-            token = access_token
-            print(f"Token 生成成功")
-            
-            # 初始化菜单列表
-            serializerMenuList = []
-            
-            # 查询用户的角色列表（使用参数化查询避免 SQL 注入）
-            roleList = SysRole.objects.raw(                
-                "SELECT id, NAME FROM sys_role WHERE id IN (SELECT role_id FROM sys_user_role WHERE user_id = %s)",
-                [user.id]
-            )
-            print(roleList)
-            # 使用 ID 集合来去重（因为 Django 模型对象不可哈希，不能直接放入 set）
-            menuIdSet = set()
-            for role in roleList:   
-                print(role.id, role.name)
-                menuList = SysMenu.objects.raw(
-                    "SELECT * FROM sys_menu WHERE id IN (SELECT menu_id FROM sys_role_menu WHERE role_id = %s)",
-                    [role.id]
-                )
-                for row2 in menuList:
-                    print(row2.id, row2.name)
-                    menuIdSet.add(row2.id)  # 只存储 ID（ID 是可哈希的）
-            
-            # 根据去重后的 ID 集合查询菜单对象
-            sorted_menuList = []
-            if menuIdSet:
-                menuList = list(SysMenu.objects.filter(id__in=menuIdSet))
-                # 根据 order_num 排序（处理 None 值，将 None 排在最后）
-                sorted_menuList = sorted(menuList, key=lambda x: (x.order_num is None, x.order_num or 0))
-                print(f"菜单数量: {len(sorted_menuList)}")
-                print(sorted_menuList)
-                for menu in sorted_menuList:
-                    print(menu.id, menu.name, menu.path, menu.component, menu.menu_type, menu.perms, menu.create_time, menu.update_time, menu.remark)
-            
-            # 构造菜单树
-            sysMenuList = self.buildTreeMenu(sorted_menuList)
-            print(f"\n{'='*60}")
-            print(f"菜单树根节点数量: {len(sysMenuList)}")
-            print(f"{'='*60}")
-            if sysMenuList:
-                print("\n菜单树结构：")
-                self.printTreeMenu(sysMenuList)
-                print(f"\n{'='*60}\n")
-            else:
-                print("菜单树为空")
-                print(f"{'='*60}\n")
-            
-            # 序列化菜单树
-            serializerMenuList = list()
-            for sysMenu in sysMenuList:
-                print(SysMenuSerializer(sysMenu))
-                print("\n")
-                serializerMenuList.append(SysMenuSerializer(sysMenu).data)
-            print(serializerMenuList)
+            refresh_token = await sync_to_async(RefreshToken.for_user)(user)
+            access_token = refresh_token.access_token
+            
+            # 把角色ID和权限版本号写入 access token，同时读取用户的权限集合（带缓存），其中已包含序列化好的菜单树
+            permissions = await sync_to_async(embed_permission_claims)(access_token, user.id)
+            token = str(access_token)
+            serializerMenuList = permissions['menu_tree']
+            logger.debug("登录成功", extra={'username': username, 'user_id': user.id, 'menu_roots': len(serializerMenuList)})
                     
         except SysUser.DoesNotExist:
-            print(f"用户不存在: {username}")
+            logger.info("登录失败：用户不存在", extra={'username': username})
             return JsonResponse({'code': 500, 'info': '用户名或者密码错误！'})
         except Exception as e:
-            print(f"登录错误: {e}")
-            print(f"错误类型: {type(e).__name__}")
-            import traceback
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("登录错误: %s", e, extra={'username': username})
             return JsonResponse({
                 'code': 500, 
                 'info': '登录失败，请稍后重试！',
@@ -251,15 +163,15 @@ class JwtTestView(View):
 @method_decorator(csrf_exempt, name='dispatch')
 class SaveView(View):
 
-    def post(self, request):
+    async def post(self, request):
         try:
             data = json.loads(request.body.decode("utf-8"))
-            print(data)
+            logger.debug("保存用户", extra={'data': data})
             from datetime import datetime
             
             if data['id'] == -1:  # 添加新用户
                 # 检查用户名是否已存在
-                if SysUser.objects.filter(username=data['username']).exists():
+                if await SysUser.objects.filter(username=data['username']).aexists():
                     return JsonResponse({'code': 500, 'errorInfo': '用户名已存在！'})
                 
                 # 创建新用户
@@ -274,20 +186,23 @@ class SaveView(View):
                 )
                 # 设置密码（会自动加密）
                 if 'password' in data and data['password']:
-                    obj_sysUser.set_password(data['password'])
+                    await obj_sysUser.aset_password(data['password'])
                 else:
-                    obj_sysUser.set_password('123456')  # 默认密码
-                obj_sysUser.save()
+                    await obj_sysUser.aset_password('123456')  # 默认密码
+                await obj_sysUser.asave()
+                await sync_to_async(index_objects)('user', [(obj_sysUser.id, obj_sysUser.username)])
+                await sync_to_async(bump_table_versions)(SysUser)
                 return JsonResponse({'code': 200, 'info': '添加成功！'})
             else:  # 修改用户
                 try:
-                    obj_sysUser = SysUser.objects.get(id=data['id'])
+                    obj_sysUser = await SysUser.objects.aget(id=data['id'])
                 except SysUser.DoesNotExist:
                     return JsonResponse({'code': 500, 'errorInfo': '用户不存在！'})
                 
                 # 检查用户名是否被其他用户使用
-                if data['username'] != obj_sysUser.username:
-                    if SysUser.objects.filter(username=data['username']).exclude(id=data['id']).exists():
+                username_changed = data['username'] != obj_sysUser.username
+                if username_changed:
+                    if await SysUser.objects.filter(username=data['username']).exclude(id=data['id']).aexists():
                         return JsonResponse({'code': 500, 'errorInfo': '用户名已被其他用户使用！'})
                 
                 # 更新用户信息
@@ -300,21 +215,23 @@ class SaveView(View):
                 
                 # 如果提供了新密码，则更新密码
                 if 'password' in data and data['password']:
-                    obj_sysUser.set_password(data['password'])
+                    await obj_sysUser.aset_password(data['password'])
                 
-                obj_sysUser.save()
+                await obj_sysUser.asave()
+                if username_changed:
+                    await sync_to_async(index_objects)('user', [(obj_sysUser.id, obj_sysUser.username)])
+                    # 用户名参与搜索筛选，修改后总数缓存失效
+                    await sync_to_async(bump_table_versions)(SysUser)
                 return JsonResponse({'code': 200, 'info': '修改成功！'})
         except Exception as e:
-            import traceback
-            print(f"保存用户错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("保存用户错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'操作失败：{str(e)}'})
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class PwdView(View):
 
-    def post(self, request):
+    async def post(self, request):
         data = json.loads(request.body.decode("utf-8"))
         id = data['id']
         oldPassword = data['oldPassword']
@@ -322,22 +239,20 @@ class PwdView(View):
         from datetime import datetime
         
         try:
-            obj_user = SysUser.objects.get(id=id)
-            # 使用 check_password 方法验证旧密码（支持加密和明文密码）
-            if obj_user.check_password(oldPassword):
-                # 使用 set_password 方法设置新密码（会自动加密）
-                obj_user.set_password(newPassword)
+            obj_user = await SysUser.objects.aget(id=id)
+            # 使用 acheck_password 方法验证旧密码（支持加密和明文密码）
+            if await obj_user.acheck_password(oldPassword):
+                # 使用 aset_password 方法设置新密码（会自动加密）
+                await obj_user.aset_password(newPassword)
                 obj_user.update_time = datetime.now().date()
-                obj_user.save()
+                await obj_user.asave()
                 return JsonResponse({'code': 200})
             else:
                 return JsonResponse({'code': 500, 'errorInfo': '原密码错误！'})
         except SysUser.DoesNotExist:
             return JsonResponse({'code': 500, 'errorInfo': '用户不存在！'})
         except Exception as e:
-            print(f"修改密码错误: {e}")
-            import traceback
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("修改密码错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'修改密码失败：{str(e)}'})
 
 
@@ -376,9 +291,7 @@ class UploadImageView(View):
             return JsonResponse({'code': 200, 'title': file_name})
             
         except Exception as e:
-            import traceback
-            print(f"上传图片错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("上传图片错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'上传图片失败：{str(e)}'})
 
 
@@ -394,7 +307,19 @@ class AvatarView(View):
         obj_user.save()
         return JsonResponse({'code': 200})
 
+# 用户列表输出的字段
+USER_LIST_FIELDS = (
+    'id', 'username', 'avatar', 'email', 'phonenumber',
+    'login_date', 'status', 'create_time', 'update_time', 'remark'
+)
+# 游标分页允许的排序列（必须非空）
+USER_CURSOR_ORDERINGS = ('id', 'username')
+# 用户列表 fields 参数允许的字段，roleList 需要额外查询角色
+USER_SEARCH_FIELDS = USER_LIST_FIELDS + ('roleList',)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(read_from_replica, name='dispatch')
 class SearchView(View):
     
     def post(self, request):
@@ -415,20 +340,50 @@ class SearchView(View):
             pageSize = data.get('pageSize', 10)
             query = data.get('query', '').strip()  # 去除前后空格
             
+            # 只查询、只返回 fields 指定的字段；只有请求了 roleList 才加载角色
+            try:
+                fields = parse_fields(data.get('fields'), USER_SEARCH_FIELDS)
+            except FieldsError as e:
+                return JsonResponse({'code': 400, 'errorInfo': str(e)})
+            columns = tuple(field for field in fields if field != 'roleList')
+            with_roles = 'roleList' in fields
+            
             # 构建查询，添加排序以避免分页警告
             queryset = SysUser.objects.all().order_by('id')
             
-            # 如果有查询条件，进行模糊搜索
+            # 如果有查询条件，进行模糊搜索（match 为 prefix 时按前缀匹配），由搜索后端决定是否走索引
             if query:
-                queryset = queryset.filter(username__icontains=query)
+                queryset = search_filter(queryset, 'user', query, prefix=data.get('match') == 'prefix')
             
             # 如果有 id 参数，用于筛选
             if id:
                 queryset = queryset.filter(id=id)
             
+            # 总数按筛选条件缓存，sys_user 有写入时失效
+            count = lambda: cached_count(
+                'user:search', queryset, {'query': query.lower(), 'match': data.get('match'), 'id': id}, [SysUser]
+            )
+            
+            # 游标分页：请求中带 cursor 参数（首页传 null）时使用，大表翻页不再 COUNT(*) 和 OFFSET
+            if 'cursor' in data:
+                # 游标需要排序列的值
+                order_field = str(data.get('orderBy') or 'id').removeprefix('-')
+                if order_field in USER_CURSOR_ORDERINGS and order_field not in columns:
+                    columns += (order_field,)
+                try:
+                    users, page_info = cursor_page(
+                        queryset.values(*columns), data, pageSize,
+                        orderings=USER_CURSOR_ORDERINGS, filtered=bool(query or id), count=count
+                    )
+                except CursorError as e:
+                    return JsonResponse({'code': 400, 'errorInfo': str(e)})
+                if with_roles:
+                    attach_related(users, 'roleList', load_user_roles)
+                return JsonResponse({'code': 200, 'userList': users, **page_info})
+            
             # 分页
             paginator = Paginator(queryset, pageSize)
-            total = paginator.count
+            paginator.count = total = count()
             
             try:
                 userListPage = paginator.page(pageNum)
@@ -441,22 +396,12 @@ class SearchView(View):
                     'userList': []
                 })
             
-            # 将 Page 对象中的模型实例转换为字典列表
-            # 明确指定所有需要的字段，确保包含 email 和 phonenumber
-            obj_users = userListPage.object_list.values(
-                'id', 'username', 'avatar', 'email', 'phonenumber', 
-                'login_date', 'status', 'create_time', 'update_time', 'remark'
-            )
+            # 将 Page 对象中的模型实例转换为字典列表，只查询请求的字段
+            obj_users = userListPage.object_list.values(*columns)
             users = list(obj_users)
-            for user in users:
-                userid = user['id']
-                # 查询用户的角色列表
-                sysRoleList = SysRole.objects.raw(
-                    "SELECT id, NAME FROM sys_role WHERE id IN (SELECT role_id FROM sys_user_role WHERE user_id = %s)",
-                    [userid]
-                )
-                # 将 RawQuerySet 转换为可序列化的字典列表
-                user['roleList'] = [{'id': role.id, 'name': role.name} for role in sysRoleList]
+            # 一次查询批量读取本页所有用户的角色列表
+            if with_roles:
+                attach_related(users, 'roleList', load_user_roles)
             return JsonResponse({
                 'code': 200, 
                 'total': total,
@@ -466,9 +411,7 @@ class SearchView(View):
             })
             
         except Exception as e:
-            import traceback
-            print(f"搜索用户错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("搜索用户错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'搜索失败：{str(e)}'})
 
 
@@ -476,7 +419,7 @@ class SearchView(View):
 class UpdateStatusView(View):
     def post(self, request):
         data = json.loads(request.body.decode("utf-8"))
-        print(data)
+        logger.debug("修改用户状态", extra={'data': data})
         id = data['id']
         status = data['status']
         obj_user = SysUser.objects.get(id=id)
@@ -489,7 +432,7 @@ class DeleteView(View):
     def post(self, request):
         try:
             data = json.loads(request.body.decode("utf-8"))
-            print(data)
+            logger.debug("删除用户", extra={'data': data})
             id = data.get('id')
             
             if not id:
@@ -505,25 +448,28 @@ class DeleteView(View):
                 SysUserRole.objects.filter(user_id=id).delete()
                 
                 # 然后删除用户
+                user_id = obj_user.id
                 obj_user.delete()
+                remove_objects('user', [user_id])
+                # 使已签发 token 中的角色声明失效
+                invalidate_user_permissions([user_id])
+                bump_table_versions(SysUser)
                 return JsonResponse({'code': 200, 'info': '删除成功！'})
             except SysUser.DoesNotExist:
                 return JsonResponse({'code': 500, 'errorInfo': '用户不存在！'})
         except Exception as e:
-            import traceback
-            print(f"删除用户错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
+            logger.exception("删除用户错误: %s", e)
             return JsonResponse({'code': 500, 'errorInfo': f'删除失败：{str(e)}'})
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ResetPasswordView(View):
-    def post(self, request):
+    async def post(self, request):
         data = json.loads(request.body.decode("utf-8"))
-        print(data)
+        logger.debug("重置密码", extra={'data': data})
         id = data['id']
-        obj_user = SysUser.objects.get(id=id)
-        obj_user.set_password('hualijun123')
-        obj_user.save()
+        obj_user = await SysUser.objects.aget(id=id)
+        await obj_user.aset_password(settings.RESET_PASSWORD)
+        await obj_user.asave()
         return JsonResponse({'code': 200})
  
     
@@ -539,26 +485,117 @@ class AssignRoleView(View):
                 return JsonResponse({'code': 500, 'errorInfo': '用户ID不能为空！'})
             
             # 验证用户是否存在
-            try:
-                obj_user = SysUser.objects.get(id=user_id)
-            except SysUser.DoesNotExist:
+            if not SysUser.objects.filter(id=user_id).exists():
                 return JsonResponse({'code': 500, 'errorInfo': '用户不存在！'})
             
-            # 先删除该用户的所有角色关联
-            SysUserRole.objects.filter(user_id=user_id).delete()
+            # 与现有角色求差集，只删除多余的、只插入缺少的（不存在的角色ID忽略）
+            changes = sync_links(SysUserRole, 'user_id', user_id, 'role_id', SysRole, role_ids)
             
-            # 添加新的角色关联
-            if role_ids and len(role_ids) > 0:
-                for role_id in role_ids:
-                    try:
-                        role = SysRole.objects.get(id=role_id)
-                        SysUserRole.objects.create(user=obj_user, role=role)
-                    except SysRole.DoesNotExist:
-                        print(f"角色ID {role_id} 不存在，跳过")
+            # 用户角色有变化时，使该用户的权限缓存失效
+            if changes['added'] or changes['removed']:
+                invalidate_user_permissions([user_id])
             
-            return JsonResponse({'code': 200, 'info': '角色分配成功！'})
+            return JsonResponse({'code': 200, 'info': '角色分配成功！', **changes})
+        except Exception as e:
+            logger.exception("分配角色错误: %s", e)
+            return JsonResponse({'code': 500, 'errorInfo': f'分配角色失败：{str(e)}'})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExportView(View):
+    """流式导出全部用户（format=csv/ndjson），角色列表每块批量加载一次"""
+
+    def get(self, request):
+        chunks = (
+            attach_related(chunk, 'roleList', load_user_roles)
+            for chunk in iter_chunks(SysUser.objects.values(*USER_LIST_FIELDS))
+        )
+        try:
+            return export_response(request, chunks, USER_LIST_FIELDS + ('roleList',), 'users')
+        except ExportError as e:
+            return JsonResponse({'code': 400, 'errorInfo': str(e)})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ImportView(View):
+    """
+    批量导入用户：multipart 上传 file 字段，或直接把文件内容作为请求体
+    format 参数为 csv 或 ndjson，默认按文件名（请求体按 Content-Type）判断
+    """
+
+    def post(self, request):
+        try:
+            upload = request.FILES.get('file')
+            if upload is not None:
+                fmt = request.GET.get('format') or detect_format(upload.name)
+                lines = upload
+            else:
+                fmt = request.GET.get('format') or ('ndjson' if 'ndjson' in request.content_type else 'csv')
+                lines = request
+            result = import_users(parse_rows(lines, fmt))
+            return JsonResponse({'code': 200, **result.as_dict()})
+        except (ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+            return JsonResponse({'code': 400, 'errorInfo': f'导入文件格式错误：{str(e)}'})
+        except Exception as e:
+            logger.exception("导入用户错误: %s", e)
+            return JsonResponse({'code': 500, 'errorInfo': f'导入失败：{str(e)}'})
+
+
+def parse_batch_ids(request):
+    """
+    解析批量接口的请求体，返回 (数据, ID列表, 错误响应)
+    """
+    data = json.loads(request.body.decode("utf-8"))
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return data, None, JsonResponse({'code': 400, 'errorInfo': '用户ID列表不能为空'})
+    return data, ids, None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchUpdateStatusView(View):
+    """批量修改帐号状态，停用时跳过超级管理员"""
+
+    def post(self, request):
+        try:
+            data, ids, error = parse_batch_ids(request)
+            if error:
+                return error
+            status = data.get('status')
+            if status not in (0, 1):
+                return JsonResponse({'code': 400, 'errorInfo': '帐号状态只能是 0（正常）或 1（停用）'})
+            return JsonResponse({'code': 200, **batch_update_status(ids, status)})
+        except Exception as e:
+            logger.exception("批量修改状态错误: %s", e)
+            return JsonResponse({'code': 500, 'errorInfo': f'批量修改状态失败：{str(e)}'})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchDeleteView(View):
+    """批量删除用户，跳过超级管理员"""
+
+    def post(self, request):
+        try:
+            data, ids, error = parse_batch_ids(request)
+            if error:
+                return error
+            return JsonResponse({'code': 200, **batch_delete(ids)})
+        except Exception as e:
+            logger.exception("批量删除用户错误: %s", e)
+            return JsonResponse({'code': 500, 'errorInfo': f'批量删除失败：{str(e)}'})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchResetPasswordView(View):
+    """批量重置密码，每个用户单独加密"""
+
+    async def post(self, request):
+        try:
+            data, ids, error = parse_batch_ids(request)
+            if error:
+                return error
+            result = await sync_to_async(batch_reset_password)(ids, settings.RESET_PASSWORD)
+            return JsonResponse({'code': 200, **result})
         except Exception as e:
-            import traceback
-            print(f"分配角色错误: {e}")
-            print(f"完整错误堆栈:\n{traceback.format_exc()}")
-            return JsonResponse({'code': 500, 'errorInfo': f'分配角色失败：{str(e)}'})
\ No newline at end of file
+            logger.exception("批量重置密码错误: %s", e)
+            return JsonResponse({'code': 500, 'errorInfo': f'批量重置密码失败：{str(e)}'})